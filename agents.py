@@ -0,0 +1,251 @@
+import asyncio
+import json
+import multiprocessing
+import time
+from collections import Counter
+from bids import BidEngine
+from budget import expired
+from task import Task
+import config
+
+
+class AgentState:
+    """Etat local d'un agent : position et file de tâches de son taxi (ce que lit bids.BidEngine)."""
+    __slots__ = ("position", "tasks")
+
+    def __init__(self):
+        self.position = (0.0, 0.0)
+        self.tasks = []
+
+
+def task_message(task):
+    """Tâche sous forme sérialisable en json : [id, départ, destination]."""
+    return [task.id, list(task.start), list(task.destination)]
+
+
+def message_task(data):
+    return Task(tuple(data[1]), tuple(data[2]), data[0])
+
+
+async def agent_loop(agent_id, isPenalty, receive, send):
+    """
+    Boucle d'un agent taxi. Messages reçus :
+       - state    : position et file de son taxi, envoyées par la simulation avant chaque allocation
+       - announce : tâches mises aux enchères, l'agent répond par ses offres d'insertion (message bid)
+       - award    : tâche gagnée, insérée dans sa file locale à la position de son offre
+       - stop     : fin de la boucle
+    """
+    state = AgentState()
+    while True:
+        message = await receive()
+        match message["type"]:
+            case "state":
+                state.position = tuple(message["position"])
+                state.tasks = [message_task(data) for data in message["tasks"]]
+            case "announce":
+                bids, index = BidEngine([state], isPenalty).bids([message_task(data) for data in message["tasks"]])
+                await send({"type": "bid", "agent": agent_id, "round": message["round"],
+                            "bids": bids[0].tolist(), "index": index[0].tolist()})
+            case "award":
+                state.tasks.insert(message["index"], message_task(message["task"]))
+            case "stop":
+                return
+
+
+class Transport:
+    """Transport des messages entre le commissaire-priseur et les agents : les réponses des agents arrivent dans inbox."""
+    async def receive(self):
+        return await self.inbox.get()
+
+    def drain(self):
+        """Retire les messages déjà arrivés (sans attendre)."""
+        messages = []
+        while not self.inbox.empty():
+            messages.append(self.inbox.get_nowait())
+        return messages
+
+
+class QueueTransport(Transport):
+    """Agents exécutés comme coroutines dans le processus de la simulation, reliés par des asyncio.Queue."""
+    async def start(self, num_agents, isPenalty):
+        self.inbox = asyncio.Queue() # Messages des agents vers le commissaire-priseur
+        self.queues = [asyncio.Queue() for _ in range(num_agents)]
+        self.agents = [asyncio.create_task(agent_loop(k, isPenalty, queue.get, self.inbox.put))
+                       for k, queue in enumerate(self.queues)]
+
+    async def send(self, k, message):
+        await self.queues[k].put(message)
+
+    async def close(self):
+        for k in range(len(self.queues)):
+            await self.send(k, {"type": "stop"})
+        await asyncio.gather(*self.agents)
+
+
+async def socket_agent(host, port, agent_id, isPenalty):
+    """Agent d'un processus séparé : messages json (un par ligne) sur une connexion TCP au commissaire-priseur."""
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(message):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    async def receive():
+        return json.loads(await reader.readline())
+
+    await send({"type": "hello", "agent": agent_id})
+    await agent_loop(agent_id, isPenalty, receive, send)
+    writer.close()
+    await writer.wait_closed()
+
+
+def agent_process(host, port, agent_id, isPenalty):
+    asyncio.run(socket_agent(host, port, agent_id, isPenalty))
+
+
+class SocketTransport(Transport):
+    """
+    Agents exécutés dans des processus séparés de la même machine, reliés au commissaire-priseur
+    par des connexions TCP locales. Même interface que QueueTransport.
+    """
+    def __init__(self, host="127.0.0.1"):
+        self.host = host
+
+    async def start(self, num_agents, isPenalty):
+        self.inbox = asyncio.Queue()
+        self.writers = [None] * num_agents
+        connected = asyncio.Event()
+
+        async def handle(reader, writer):
+            hello = json.loads(await reader.readline())
+            self.writers[hello["agent"]] = writer
+            if all(writer is not None for writer in self.writers):
+                connected.set()
+            while line := await reader.readline():
+                await self.inbox.put(json.loads(line))
+
+        self.server = await asyncio.start_server(handle, self.host, 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.processes = [multiprocessing.Process(target=agent_process, args=(self.host, port, k, isPenalty), daemon=True)
+                          for k in range(num_agents)]
+        for process in self.processes:
+            process.start()
+        if num_agents:
+            await connected.wait()
+
+    async def send(self, k, message):
+        writer = self.writers[k]
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    async def close(self):
+        for k in range(len(self.writers)):
+            await self.send(k, {"type": "stop"})
+        for process in self.processes:
+            await asyncio.to_thread(process.join)
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def make_transport(name):
+    match name:
+        case "queue":
+            return QueueTransport()
+        case "socket":
+            return SocketTransport()
+        case _:
+            raise ValueError(f"Transport d'agents non reconnu : {name}")
+
+
+class AgentRuntime:
+    """
+    Enchères décentralisées : chaque taxi est représenté par un agent (coroutine asyncio ou processus,
+    selon le transport) qui calcule lui-même ses offres, et la simulation joue le rôle de commissaire-priseur.
+    Un tour d'enchères annonce des tâches à tous les agents et attend leurs offres jusqu'à
+    config.AGENT_BID_TIMEOUT : les offres arrivées ensuite sont ignorées (comptées comme en retard).
+    Les messages échangés et la durée de chaque tour sont mesurés, comme les verrait un vrai système de répartition.
+    La boucle asyncio est propre au runtime : allocate() s'appelle depuis le code synchrone de la simulation.
+    """
+    def __init__(self, num_agents, isPenalty=False, transport=None, bid_timeout=None):
+        self.num_agents = num_agents
+        self.bid_timeout = config.AGENT_BID_TIMEOUT if bid_timeout is None else bid_timeout
+        self.transport = make_transport(transport or config.AGENT_TRANSPORT)
+        self.messages = Counter() # Nombre de messages par type (state, announce, bid, award), et offres en retard (late)
+        self.round_latencies = [] # Durée (en secondes) de chaque tour d'enchères, de l'annonce à la dernière offre reçue
+        self.round = 0
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.transport.start(num_agents, isPenalty))
+
+    def close(self):
+        """Arrête les agents. Les mesures (messages, round_latencies) restent disponibles."""
+        if self.loop.is_closed():
+            return
+        self.loop.run_until_complete(self.transport.close())
+        self.loop.close()
+
+    def allocate(self, taxis, tasks, protocol="ssi", deadline=None):
+        """
+        Met les tâches aux enchères, séquentiellement (ssi) ou en un seul tour (psi).
+        Retourne les attributions [(tâche, indice du taxi, position d'insertion)...] dans l'ordre où elles
+        doivent être appliquées, et les tâches qui n'ont reçu aucune offre ou pas été annoncées avant deadline.
+        """
+        return self.loop.run_until_complete(self._allocate(taxis, tasks, protocol, deadline))
+
+    async def _send(self, k, message):
+        self.messages[message["type"]] += 1
+        await self.transport.send(k, message)
+
+    async def _auction(self, tasks):
+        """Un tour d'enchères. Retourne les offres reçues à temps, {agent: (offres, positions d'insertion)}."""
+        self.round += 1
+        # Offres des tours précédents arrivées après leur délai
+        late = self.transport.drain()
+        self.messages["bid"] += len(late)
+        self.messages["late"] += len(late)
+        start = time.perf_counter()
+        announce = {"type": "announce", "round": self.round, "tasks": [task_message(task) for task in tasks]}
+        for k in range(self.num_agents):
+            await self._send(k, announce)
+
+        bids = {}
+        while len(bids) < self.num_agents:
+            remaining = start + self.bid_timeout - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(self.transport.receive(), remaining)
+            except asyncio.TimeoutError:
+                break
+            self.messages["bid"] += 1
+            if message["round"] != self.round: # Offre d'un tour précédent
+                self.messages["late"] += 1
+                continue
+            bids[message["agent"]] = (message["bids"], message["index"])
+        self.round_latencies.append(time.perf_counter() - start)
+        return bids
+
+    async def _award(self, bids, j, task, awarded):
+        """Attribue la tâche j du tour à la meilleure offre (à égalité, l'agent de plus petit indice, comme np.argmin)."""
+        offers = [(agent_bids[j], k, index[j]) for k, (agent_bids, index) in bids.items()]
+        if not offers:
+            return
+        _, k, index = min(offers)
+        await self._send(k, {"type": "award", "task": task_message(task), "index": index})
+        awarded.append((task, k, index))
+
+    async def _allocate(self, taxis, tasks, protocol, deadline):
+        for k, taxi in enumerate(taxis):
+            await self._send(k, {"type": "state", "position": list(taxi.position),
+                                 "tasks": [task_message(task) for task in taxi.tasks]})
+        awarded = []
+        if protocol == "psi":
+            bids = await self._auction(tasks)
+            for j, task in enumerate(tasks):
+                await self._award(bids, j, task, awarded)
+        else:
+            for task in tasks:
+                if expired(deadline):
+                    break
+                await self._award(await self._auction([task]), 0, task, awarded)
+        done = {id(task) for task, _, _ in awarded}
+        return awarded, [task for task in tasks if id(task) not in done]
@@ -0,0 +1,121 @@
+import config
+
+
+class Arrivals:
+    """
+    Processus d'arrivée des tâches d'une source (sources.TaskStream).
+    Chaque tâche reçoit son temps de création (Task.created, en ms) et release(current_time)
+    retourne les tâches arrivées jusqu'à current_time, à allouer au prochain tour d'allocation.
+    Les sous-classes définissent arrival_time(task), le temps de création de la prochaine tâche.
+    Un tour d'allocation a lieu à chaque arrivée (next_arrival), sauf pour les processus périodiques
+    (periodic), dont les tâches arrivent à chaque tour, tous les TASK_INTERVAL ms.
+    """
+    periodic = False
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.next_time = None # Temps de création de la prochaine tâche, une fois tiré
+
+    def __bool__(self):
+        return bool(self.stream)
+
+    def arrival_time(self, task):
+        raise NotImplementedError
+
+    def next_arrival(self):
+        """Temps de création (en ms) de la prochaine tâche, None s'il n'y en a plus."""
+        if not self.stream:
+            return None
+        if self.next_time is None:
+            self.next_time = self.arrival_time(self.stream.pending)
+        return self.next_time
+
+    def release(self, current_time):
+        tasks = []
+        while self.stream:
+            if self.next_arrival() > current_time:
+                break
+            task = self.stream.batch(1)[0]
+            task.created = self.next_time
+            self.next_time = None
+            tasks.append(task)
+        return tasks
+
+
+class BatchArrivals(Arrivals):
+    """Fonctionnement d'origine : num_tasks tâches arrivent à chaque tour d'allocation (tous les TASK_INTERVAL ms)."""
+    periodic = True
+
+    def __init__(self, stream, num_tasks):
+        super().__init__(stream)
+        self.num_tasks = num_tasks
+
+    def release(self, current_time):
+        tasks = self.stream.batch(self.num_tasks)
+        for task in tasks:
+            task.created = current_time
+        return tasks
+
+
+class PoissonArrivals(Arrivals):
+    """Arrivées selon un processus de Poisson de taux rate (tâches par seconde) : délais exponentiels."""
+    def __init__(self, stream, rate, rng):
+        super().__init__(stream)
+        self.rate = rate
+        self.rng = rng
+        self.time = 0.0 # Temps de la dernière arrivée (en ms)
+
+    def arrival_time(self, task):
+        self.time += self.rng.expovariate(self.rate) * 1000
+        return self.time
+
+
+class BurstyArrivals(Arrivals):
+    """
+    Arrivées en rafales (processus de Poisson modulé par une chaîne de Markov à deux états) :
+    le taux alterne entre rates[0] (calme) et rates[1] (rafale), en tâches par seconde,
+    chaque état durant en moyenne durations[0] et durations[1] ms (durées exponentielles).
+    """
+    def __init__(self, stream, rates, durations, rng):
+        super().__init__(stream)
+        self.rates = rates
+        self.durations = durations
+        self.rng = rng
+        self.time = 0.0
+        self.state = 0
+        self.state_end = rng.expovariate(1 / durations[0])
+
+    def arrival_time(self, task):
+        while True:
+            candidate = self.time + self.rng.expovariate(self.rates[self.state]) * 1000
+            if candidate <= self.state_end:
+                self.time = candidate
+                return self.time
+            # Changement d'état avant la prochaine arrivée : le processus étant sans mémoire,
+            # on repart de la fin de l'état avec le nouveau taux
+            self.time = self.state_end
+            self.state = 1 - self.state
+            self.state_end = self.time + self.rng.expovariate(1 / self.durations[self.state])
+
+
+class TraceArrivals(Arrivals):
+    """Arrivées rejouées depuis une trace : chaque tâche porte son temps de création (champ time du fichier)."""
+    def arrival_time(self, task):
+        if task.created is None:
+            raise ValueError(f"Tâche {task.id} sans temps de création dans la trace")
+        return task.created
+
+
+def make_arrivals(mode, stream, num_tasks, rng):
+    """Construit le processus d'arrivée mode (batch, poisson, bursty ou trace) avec les paramètres de config.py."""
+    match mode:
+        case "batch":
+            return BatchArrivals(stream, num_tasks)
+        case "poisson":
+            return PoissonArrivals(stream, config.POISSON_RATE, rng)
+        case "bursty":
+            return BurstyArrivals(stream, config.BURST_RATES, config.BURST_DURATIONS, rng)
+        case "trace":
+            return TraceArrivals(stream)
+        case _:
+            raise ValueError(f"Mode d'arrivée non reconnu : {mode}")
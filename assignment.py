@@ -0,0 +1,68 @@
+import numpy as np
+from budget import expired
+
+
+def hungarian(cost, deadline=None):
+    """
+    Algorithme hongrois (version par plus courts chemins augmentants, O(n^2.m)) pour une matrice
+    de coûts rectangulaire n x m avec n <= m : chaque ligne reçoit une colonne distincte et la somme
+    des coûts est minimale. Retourne, pour chaque ligne, l'indice de sa colonne.
+    Les lignes sont ajoutées une à une à l'affectation optimale des précédentes : si deadline est
+    dépassée, les lignes restantes prennent tour à tour la moins chère des colonnes libres.
+    """
+    cost = np.asarray(cost, dtype=float)
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("hungarian : il faut au moins autant de colonnes que de lignes")
+
+    # Potentiels des lignes (u) et des colonnes (v), p[j] = ligne affectée à la colonne j (indices à partir de 1)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+
+    assigned = n # Nombre de lignes traitées par l'algorithme
+    for i in range(1, n + 1):
+        if expired(deadline):
+            assigned = i - 1
+            break
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            # Mise à jour vectorisée des coûts réduits des colonnes non visitées
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            # Ajustement des potentiels
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Augmentation le long du chemin trouvé
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    result = np.zeros(n, dtype=int)
+    for j in range(1, m + 1):
+        if p[j]:
+            result[p[j] - 1] = j - 1
+    if assigned < n:
+        free = p[1:] == 0
+        for i in range(assigned, n):
+            j = int(np.argmin(np.where(free, cost[i], np.inf)))
+            result[i] = j
+            free[j] = False
+    return result
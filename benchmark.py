@@ -0,0 +1,84 @@
+import itertools
+import json
+import os
+import time
+from multiprocessing import Pool
+from events import run_event_driven
+
+
+# Grille de paramètres par défaut : chaque combinaison correspond à une simulation
+DEFAULT_GRID = {
+    "resolutionType": ["greedy", "PSI", "SSI", "regret", "optimal"],
+    "isPenalty": [False, True],
+    "NUM_TAXIS": [3],
+    "NUM_TASKS_SPAWN": [5],
+    "seed": [0, 1, 2],
+}
+
+
+def expand_grid(grid):
+    """Transforme un dictionnaire {paramètre: [valeurs]} en liste de configurations (produit cartésien)."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def run_one(params):
+    """
+    Exécute une simulation (noyau à événements discrets, sans affichage) pour une configuration.
+    Les tâches sont générées aléatoirement avec la graine donnée, la simulation est donc reproductible.
+    """
+    result = run_event_driven(params["resolutionType"],
+                              isPenalty=params.get("isPenalty", False),
+                              random_task=params.get("random_task", True),
+                              algo=params.get("algo", "none"),
+                              max_time=params.get("max_time"),
+                              num_taxis=params["NUM_TAXIS"],
+                              num_tasks_spawn=params["NUM_TASKS_SPAWN"],
+                              seed=params["seed"],
+                              task_file=params.get("task_file", "task_created.json"),
+                              arrival=params.get("arrival"),
+                              reoptimize=params.get("reoptimize"))
+    result["params"] = params
+    return result
+
+
+def run_benchmark(grid=None, output="benchmark.jsonl", processes=None, max_time=60):
+    """
+    Lance toutes les simulations de la grille dans un pool de processus.
+    Les résultats sont écrits au fur et à mesure, une ligne JSON par simulation, par le seul
+    processus principal : le fichier n'est jamais relu ni réécrit, contrairement à res.json.
+    max_time : durée simulée (en secondes) de chaque simulation, les tâches aléatoires étant infinies.
+    """
+    if grid is None:
+        grid = DEFAULT_GRID
+    configurations = expand_grid(grid)
+    for params in configurations:
+        params.setdefault("max_time", max_time)
+
+    results = []
+    start = time.perf_counter()
+    with Pool(processes) as pool, open(output, "a") as f:
+        for result in pool.imap_unordered(run_one, configurations):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            results.append(result)
+            print(f"{result['params']} : coût moyen {result['moyenne du cout de route']:.1f}, "
+                  f"{result['temps moyen par tour'] * 1000:.2f} ms par tour d'allocation")
+
+    print(f"{len(results)} simulations en {time.perf_counter() - start:.2f}s")
+    return results
+
+
+def load_results(output="benchmark.jsonl"):
+    """Relit les résultats d'un benchmark (une ligne JSON par simulation)."""
+    results = []
+    with open(output, "r") as f:
+        for line in f:
+            if line.strip():
+                results.append(json.loads(line))
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from bids import insertion_deltas, best_insertions, task_points
+
+
+# Tableaux de BidEngine copiés en mémoire partagée à chaque tour, dans cet ordre
+ENGINE_ARRAYS = ("prev", "next", "valid", "has_next", "prev_next", "penalty")
+
+_attached = {} # Segment de mémoire partagée ouvert par un processus du pool : {"name": ..., "shm": ...}
+
+
+def _views(buffer, layout):
+    """Tableaux NumPy sur le segment partagé, d'après layout {nom: (décalage, forme, type)}."""
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for name, (offset, shape, dtype) in layout.items()}
+
+
+def _attach(name, layout):
+    """Ouvre le segment du tour (une seule fois par processus et par tour) et retourne ses tableaux."""
+    if _attached.get("name") != name:
+        if "shm" in _attached:
+            _attached["shm"].close()
+        _attached["shm"] = shared_memory.SharedMemory(name=name)
+        _attached["name"] = name
+    return _views(_attached["shm"].buf, layout)
+
+
+def _shard_bids(name, layout, begin, end, count):
+    """
+    Calcule dans un processus du pool les offres des taxis begin..end-1 pour toutes les tâches du tour.
+    Si count est None, les offres et positions d'insertion sont écrites directement dans les tableaux
+    de sortie partagés ; sinon seules les count meilleures offres de chaque tâche sont retournées,
+    sous la forme (offres, taxis, positions), chacun de forme (count, tâches).
+    """
+    arrays = _attach(name, layout)
+    delta = insertion_deltas(*(arrays[key][begin:end] for key in ENGINE_ARRAYS[:-1]), arrays["starts"], arrays["ends"])
+    bids, index = best_insertions(delta, arrays["penalty"][begin:end])
+    if count is None:
+        arrays["bids"][begin:end] = bids
+        arrays["index"][begin:end] = index
+        return None
+    # Tri stable : à offre égale, le taxi de plus petit indice passe en premier, comme np.argmin
+    best = np.argsort(bids, axis=0, kind="stable")[:count]
+    return (np.take_along_axis(bids, best, axis=0), best + begin, np.take_along_axis(index, best, axis=0))
+
+
+class BidPool:
+    """
+    Calcul parallèle des offres pour les grandes flottes : les taxis sont répartis en tranches entre
+    les processus d'un pool persistant (créé au premier tour). A chaque tour, les tableaux de la
+    flotte (ceux de bids.BidEngine) et les tâches sont copiés une seule fois dans un segment de
+    mémoire partagée, que les processus lisent sans sérialisation. Les résultats sont identiques
+    à ceux de BidEngine.bids.
+    """
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = None
+
+    @property
+    def available(self):
+        """Les processus d'un Pool (par exemple ceux de benchmark.py) ne peuvent pas créer leur propre pool."""
+        return not multiprocessing.current_process().daemon
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def _round(self, engine, tasks, count):
+        """Copie l'état du tour en mémoire partagée et répartit le calcul des offres entre les processus."""
+        if self.pool is None:
+            # Le suivi des segments est démarré avant le pool pour que ses processus le partagent :
+            # seul le processus principal, qui crée et supprime les segments, en reste responsable
+            resource_tracker.ensure_running()
+            self.pool = multiprocessing.Pool(self.processes)
+        engine._ensure_filled(slice(None))
+        num_taxis = len(engine.taxis)
+        profiler = engine.profiler
+        if profiler.active: # Les processus du pool ne tiennent pas les compteurs : on compte les offres ici
+            profiler.count("offres evaluees", num_taxis * len(tasks))
+            profiler.count("insertions evaluees", int(engine.valid.sum()) * len(tasks))
+        starts, ends = task_points(tasks)
+        arrays = {name: getattr(engine, name) for name in ENGINE_ARRAYS}
+        arrays["starts"], arrays["ends"] = starts, ends
+        if count is None:
+            arrays["bids"] = np.empty((num_taxis, len(tasks)))
+            arrays["index"] = np.empty((num_taxis, len(tasks)), dtype=np.intp)
+
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            size = -(-size // 16) * 16 # Alignement de chaque tableau
+            layout[name] = (size, array.shape, array.dtype.str)
+            size += array.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            views = _views(shm.buf, layout)
+            for name, array in arrays.items():
+                if name not in ("bids", "index"):
+                    views[name][...] = array
+            bounds = np.linspace(0, num_taxis, min(self.processes, num_taxis) + 1).astype(int)
+            shards = [(shm.name, layout, int(begin), int(end), count) for begin, end in zip(bounds, bounds[1:])]
+            results = self.pool.starmap(_shard_bids, shards)
+            if count is None:
+                results = (views["bids"].copy(), views["index"].copy())
+            del views
+        finally:
+            shm.close()
+            shm.unlink()
+        return results
+
+    def bids(self, engine, tasks):
+        """Equivalent parallèle de engine.bids(tasks) : offres et positions d'insertion (taxis, tâches)."""
+        return self._round(engine, tasks, None)
+
+    def best_bids(self, engine, tasks, count=1):
+        """
+        Les count meilleures offres de chaque tâche, fusionnées à partir de celles de chaque tranche :
+        tableaux (offres, taxis, positions d'insertion), chacun de forme (count, tâches), par offre croissante.
+        """
+        results = self._round(engine, tasks, count)
+        bids, taxis, index = (np.concatenate(parts) for parts in zip(*results))
+        best = np.argsort(bids, axis=0, kind="stable")[:count]
+        return (np.take_along_axis(bids, best, axis=0), np.take_along_axis(taxis, best, axis=0),
+                np.take_along_axis(index, best, axis=0))
@@ -0,0 +1,174 @@
+import heapq
+import numpy as np
+from profiling import NullProfiler
+
+
+def insertion_deltas(prev, next, valid, has_next, prev_next, starts, ends):
+    """
+    Tenseur (taxis, tâches, positions) des surcoûts d'insertion des tâches (starts, ends) dans les files
+    décrites par les tableaux de BidEngine (restreints à certains taxis), inf pour les positions inexistantes.
+    Fonction pure, utilisée aussi par les processus de bidpool.BidPool sur leur part de la flotte.
+    """
+    lengths = np.linalg.norm(ends - starts, axis=-1)
+    to_start = np.linalg.norm(prev[:, None, :, :] - starts[None, :, None, :], axis=-1)
+    from_end = np.linalg.norm(next[:, None, :, :] - ends[None, :, None, :], axis=-1)
+    delta = to_start + lengths[None, :, None] + np.where(has_next[:, None, :], from_end - prev_next[:, None, :], 0.0)
+    return np.where(valid[:, None, :], delta, np.inf)
+
+
+def best_insertions(delta, penalty):
+    """Offres (taxis, tâches) : meilleur surcoût d'insertion plus la pénalité du taxi, et position d'insertion associée."""
+    index = np.argmin(delta, axis=2)
+    bids = np.take_along_axis(delta, index[:, :, None], axis=2)[:, :, 0] + penalty[:, None]
+    return bids, index
+
+
+def task_points(tasks):
+    """Tableaux (tâches, 2) des départs et des destinations."""
+    starts = np.array([task.start for task in tasks], dtype=float).reshape(-1, 2)
+    ends = np.array([task.destination for task in tasks], dtype=float).reshape(-1, 2)
+    return starts, ends
+
+
+def regret_queue(regrets):
+    """
+    File de priorité des tâches par regret décroissant (écart entre la meilleure et la seconde offre).
+    En cas d'égalité, l'ordre initial des tâches est conservé.
+    """
+    queue = [(-float(regret), j) for j, regret in enumerate(regrets)]
+    heapq.heapify(queue)
+    return queue
+
+
+class BidEngine:
+    """
+    Calcul vectorisé des offres (bids) des taxis pour les enchères PSI, SSI et regret.
+
+    Les files de tâches des taxis sont stockées sous forme de tableaux de coordonnées :
+       - prev[k, p] : point avant la position d'insertion p du taxi k
+                      (sa position si p == 0, sinon la destination de la tâche p-1)
+       - next[k, p] : départ de la tâche p du taxi k (s'il y en a une)
+    Le surcoût d'insertion d'une tâche (s, e) en position p se calcule alors en O(1) :
+       d(prev, s) + d(s, e) + d(e, next) - d(prev, next)
+    et le tenseur taxis x tâches x positions est obtenu en une seule opération NumPy.
+    Les offres évaluées sont comptées par profiler (celui de la simulation, voir profiling.py).
+    """
+    def __init__(self, taxis, isPenalty=False, profiler=None):
+        self.taxis = taxis
+        self.isPenalty = isPenalty
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        num_taxis = len(taxis)
+        max_tasks = max((len(taxi.tasks) for taxi in taxis), default=0)
+
+        self.prev = np.zeros((num_taxis, max_tasks + 1, 2))
+        self.next = np.zeros((num_taxis, max_tasks + 1, 2))
+        self.valid = np.zeros((num_taxis, max_tasks + 1), dtype=bool)    # Positions d'insertion existantes
+        self.has_next = np.zeros((num_taxis, max_tasks + 1), dtype=bool) # Une tâche suit la position d'insertion
+        self.prev_next = np.zeros((num_taxis, max_tasks + 1))            # Distance prev -> next, qui disparaît lors d'une insertion
+        self.penalty = np.zeros(num_taxis)
+        # Les tableaux d'un taxi ne sont remplis que lorsque son offre est demandée pour la première fois
+        # (utile quand seuls les taxis proches sont interrogés, voir spatial.py)
+        self.filled = np.zeros(num_taxis, dtype=bool)
+
+    def _ensure_filled(self, taxi_indices):
+        missing = np.flatnonzero(~self.filled[taxi_indices])
+        if missing.size:
+            if not isinstance(taxi_indices, slice):
+                missing = np.asarray(taxi_indices)[missing]
+            for k in missing:
+                self.refresh_taxi(int(k))
+
+    def _fill_taxi(self, k):
+        """Remplit les tableaux du taxi k à partir de sa file de tâches actuelle."""
+        taxi = self.taxis[k]
+        n = len(taxi.tasks)
+        self.prev[k] = 0
+        self.next[k] = 0
+        self.valid[k] = False
+        self.has_next[k] = False
+        self.prev_next[k] = 0
+
+        self.prev[k, 0] = taxi.position
+        if n:
+            self.prev[k, 1:n + 1] = [task.destination for task in taxi.tasks]
+            self.next[k, :n] = [task.start for task in taxi.tasks]
+            self.prev_next[k, :n] = np.linalg.norm(self.next[k, :n] - self.prev[k, :n], axis=-1)
+        self.valid[k, :n + 1] = True
+        self.has_next[k, :n] = True
+        if self.isPenalty:
+            self.penalty[k] = n * 50 # Coût de pénalité en fonction de la taille de la file d'attente
+        self.filled[k] = True
+
+    def refresh_taxi(self, k):
+        """Met à jour les tableaux du taxi k après une modification de sa file (agrandis si besoin)."""
+        missing = len(self.taxis[k].tasks) + 1 - self.prev.shape[1]
+        if missing > 0:
+            self.prev = np.pad(self.prev, ((0, 0), (0, missing), (0, 0)))
+            self.next = np.pad(self.next, ((0, 0), (0, missing), (0, 0)))
+            self.valid = np.pad(self.valid, ((0, 0), (0, missing)))
+            self.has_next = np.pad(self.has_next, ((0, 0), (0, missing)))
+            self.prev_next = np.pad(self.prev_next, ((0, 0), (0, missing)))
+        self._fill_taxi(k)
+
+    def delta_tensor(self, tasks, taxi_indices=slice(None)):
+        """
+        Tenseur (taxis, tâches, positions) des surcoûts d'insertion, inf pour les positions inexistantes.
+        taxi_indices permet de restreindre le calcul à certains taxis.
+        """
+        self._ensure_filled(taxi_indices)
+        starts, ends = task_points(tasks)
+        return insertion_deltas(self.prev[taxi_indices], self.next[taxi_indices], self.valid[taxi_indices],
+                                self.has_next[taxi_indices], self.prev_next[taxi_indices], starts, ends)
+
+    def bids(self, tasks, taxi_indices=slice(None)):
+        """
+        Retourne deux tableaux (taxis, tâches) : l'offre de chaque taxi pour chaque tâche
+        (meilleur surcoût d'insertion, plus la pénalité éventuelle) et la position d'insertion associée.
+        """
+        delta = self.delta_tensor(tasks, taxi_indices)
+        if self.profiler.active:
+            self.profiler.count("offres evaluees", delta.shape[0] * delta.shape[1]) # Couples (taxi, tâche)
+            self.profiler.count("insertions evaluees", int(self.valid[taxi_indices].sum()) * len(tasks)) # Positions d'insertion existantes
+        return best_insertions(delta, self.penalty[taxi_indices])
+
+
+class BidCache:
+    """
+    Cache des offres (taxi, tâche) pour les enchères séquentielles (SSI et regret).
+    Attribuer une tâche ne modifie que la file du taxi gagnant : seule sa ligne est
+    recalculée, pour les tâches restantes. Un tour d'allocation de T tâches sur K taxis
+    coûte ainsi O(T.K + T^2) évaluations d'insertion au lieu de O(T^2.K).
+    Les offres initiales peuvent être fournies (bids, par exemple calculées par bidpool.BidPool).
+    """
+    def __init__(self, engine, tasks, bids=None):
+        self.engine = engine
+        self.tasks = tasks
+        self.bids, self.index = engine.bids(tasks) if bids is None else bids
+        self.pending = np.ones(len(tasks), dtype=bool) # Tâches pas encore attribuées
+
+    def best_bid(self, j):
+        """Retourne (indice du taxi, position d'insertion) de la meilleure offre pour la tâche j."""
+        k = int(np.argmin(self.bids[:, j]))
+        return k, int(self.index[k, j])
+
+    def regret_queue(self):
+        """
+        File de priorité des tâches par regret décroissant (écart entre la meilleure et la seconde offre).
+        En cas d'égalité, l'ordre initial des tâches est conservé.
+        """
+        if self.bids.shape[0] > 1:
+            sorted_bids = np.sort(self.bids, axis=0)
+            regrets = sorted_bids[1] - sorted_bids[0]
+        else:
+            regrets = np.full(len(self.tasks), np.inf)
+        return regret_queue(regrets)
+
+    def invalidate(self, k, j):
+        """La tâche j vient d'être attribuée au taxi k : on recalcule uniquement les offres de ce taxi."""
+        self.pending[j] = False
+        self.engine.refresh_taxi(k)
+        remaining = np.flatnonzero(self.pending)
+        if remaining.size:
+            bids, index = self.engine.bids([self.tasks[i] for i in remaining], taxi_indices=[k])
+            self.bids[k, remaining] = bids[0]
+            self.index[k, remaining] = index[0]
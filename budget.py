@@ -0,0 +1,16 @@
+import time
+
+
+def deadline_in(seconds):
+    """Echéance (au sens de time.perf_counter) dans seconds secondes, None si seconds est None (pas de limite)."""
+    return None if seconds is None else time.perf_counter() + seconds
+
+
+def remaining(deadline):
+    """Temps restant (en secondes, éventuellement négatif) avant l'échéance, None s'il n'y en a pas."""
+    return None if deadline is None else deadline - time.perf_counter()
+
+
+def expired(deadline):
+    """Vrai si l'échéance est dépassée (jamais si deadline est None)."""
+    return deadline is not None and time.perf_counter() >= deadline
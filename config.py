@@ -2,12 +2,43 @@
 WIDTH = 800  # Largeur de la fenêtre (en pixels)
 HEIGHT = 600 # Hauteur de la fenêtre (en pixels)
 FPS = 60     # Taux de rafraîchissement (images par seconde)
+RENDER_THREADED = True # La simulation avance dans son propre thread, l'affichage dessine ses instantanés (runner.py)
+REALTIME = True        # Avec RENDER_THREADED, le temps simulé suit l'horloge (sinon il avance aussi vite que possible)
 
 # --- Paramètres de simulation ---
 NUM_TAXIS = 3             # Nombre de taxis
 TASK_INTERVAL = 5000      # Intervalle de génération d'une nouvelle tâche (ms)
 NUM_TASKS_SPAWN = 5       # Nombre de tâches générées à chaque intervalle
 TAXI_SPEED = 200          # Vitesse du taxi (pixels par seconde)
+VECTORIZED_STEP_MIN_TAXIS = 150 # Taille de flotte à partir de laquelle les taxis avancent en une opération (Fleet.step)
+
+# --- Processus d'arrivée des tâches (arrivals.py) ---
+ARRIVAL_MODE = "batch"        # batch (NUM_TASKS_SPAWN tâches par intervalle), poisson, bursty ou trace (temps lus dans le fichier)
+POISSON_RATE = 1.0            # Taux d'arrivée du mode poisson (tâches par seconde)
+BURST_RATES = (0.5, 5.0)      # Taux d'arrivée du mode bursty, hors rafale et en rafale (tâches par seconde)
+BURST_DURATIONS = (20000, 3000) # Durées moyennes des périodes calmes et des rafales (ms)
+
+# --- Paramètres de planification des itinéraires ---
+MAX_EXACT_PLANNING_TASKS = 10     # Au-delà de ce nombre de tâches, plan_route utilise l'heuristique au lieu de Held-Karp
+PLANNING_LOCAL_SEARCH_PASSES = 5  # Nombre maximal de passes 2-opt / or-opt de l'heuristique
+
+# --- Budget de calcul des allocations (Simulation.allocate) ---
+ALLOCATION_BUDGET = None  # Durée maximale d'un tour d'allocation (s) : passé ce délai, la meilleure allocation trouvée est appliquée. None : pas de limite
+                          # (mesurée en temps réel : avec une limite, les résultats ne sont plus reproductibles)
+
+# --- Réoptimisation à horizon glissant (Simulation.reoptimize_unstarted) ---
+REOPTIMIZATION = False              # Réallouer périodiquement les tâches pas encore prises en charge
+REOPTIMIZATION_INTERVAL = 10000     # Intervalle minimal entre deux passes (ms)
+REOPTIMIZATION_EVALUATIONS = 2000   # Nombre d'offres (taxi, tâche) visé par passe : fixe le nombre de tâches réallouées
+REOPTIMIZATION_BUDGET = None        # Temps de calcul visé par passe (s) : si donné, le nombre de tâches réallouées s'adapte
+                                    # au temps mesuré (résultats non reproductibles). None : seul REOPTIMIZATION_EVALUATIONS compte
+REOPTIMIZATION_MAX_TASKS = 20       # Nombre maximal de tâches réallouées par passe
+REOPTIMIZATION_LATENCY_CAP = 60000  # Les tâches créées depuis plus longtemps (ms) ne sont plus déplacées
+
+# --- Instrumentation (profiling.py) ---
+PROFILE = False          # Mesurer les phases et les tours d'allocation (traces écrites à la fin de la simulation)
+PROFILE_CPROFILE = False # Profiler aussi les tours d'allocation avec cProfile
+PROFILE_OUTPUT = "profile" # Préfixe des fichiers écrits : .jsonl, .trace.json (Chrome trace) et .prof (cProfile)
 
 # --- Couleurs (RGB) ---
 RED = (255, 0, 0)
@@ -15,4 +46,26 @@ GREEN = (0, 255, 0)
 ORANGE = (255, 165, 0)
 BLUE = (0, 0, 255)
 BLACK = (0, 0, 0)
-WHITE = (255, 255, 255) 
+WHITE = (255, 255, 255)
+
+# --- Paramètres de l'index spatial (spatial.py) ---
+SPATIAL_INDEX_MIN_TAXIS = 2000 # Taille de flotte à partir de laquelle les enchères n'interrogent que les taxis proches
+SPATIAL_CELL_SIZE = 50        # Taille (en pixels) des cases de la grille
+SPATIAL_MAX_LEG = 100         # Les taxis dont la route a un segment plus long sont toujours interrogés
+
+# --- Calcul parallèle des offres (bidpool.py) ---
+PARALLEL_BIDDING = False          # Répartir le calcul des offres entre plusieurs processus
+PARALLEL_BIDDING_MIN_TAXIS = 1000 # Taille de flotte à partir de laquelle le calcul est parallélisé
+BID_PROCESSES = None              # Nombre de processus (None : nombre de coeurs)
+
+# --- Enchères décentralisées (agents.py, resolutionType "agents") ---
+AGENT_TRANSPORT = "queue"  # queue (coroutines dans le même processus) ou socket (un processus par agent, TCP local)
+AGENT_BID_TIMEOUT = 0.5    # Délai (s) pendant lequel le commissaire-priseur attend les offres d'un tour
+
+# --- Paramètres de l'allocation optimale (algorithme hongrois) ---
+SLOT_PENALTY = 50  # Coût ajouté pour chaque place supplémentaire occupée dans la file d'un même taxi
+
+# --- Paramètres du solveur DCOP intégré (dcop.py) ---
+DPOP_MAX_TABLE_SIZE = 10**6  # Taille maximale d'une table UTIL de DPOP (nombre de taxis ^ nombre de tâches)
+DCOP_MAX_CYCLES = 100        # Nombre maximal de cycles de DSA et MGM
+DSA_PROBABILITY = 0.7        # Probabilité de changer de valeur pour DSA
@@ -0,0 +1,252 @@
+import numpy as np
+import config
+from budget import expired
+
+
+class DcopModel:
+    """
+    Modèle DCOP en mémoire pour l'allocation d'un lot de tâches.
+       - variables : les tâches (noms 'Tache_<id>')
+       - domaine   : les taxis (valeurs 'T<id>')
+       - unary[j, k]         : coût pour que le taxi k réalise la tâche j (Simulation.cost_dcop)
+       - pairwise[i, j, a, b] : coût du couple (tâche i -> taxi a, tâche j -> taxi b),
+                                ici le trajet d(destination_i, départ_j) si les deux tâches vont au même taxi.
+    Le tenseur pairwise est symétrique (pairwise[j, i] = pairwise[i, j].T) et nul sur la diagonale,
+    ce qui permet d'évaluer les coûts locaux de toutes les variables en une opération.
+    """
+    def __init__(self, variables, values, unary, pairwise):
+        self.variables = variables
+        self.values = values
+        self.unary = np.asarray(unary, dtype=float)
+        self.pairwise = np.asarray(pairwise, dtype=float)
+
+    def costs(self, X):
+        """
+        Coûts d'un lot d'affectations X (tableau (n, tâches) d'indices de taxis),
+        obtenus par lectures vectorisées dans les tables, sans évaluer d'expression.
+        """
+        X = np.atleast_2d(X)
+        index = np.arange(X.shape[1])
+        unary = self.unary[index, X].sum(axis=1)
+        # Chaque couple apparaît deux fois dans le tenseur symétrique
+        pairwise = self.pairwise[index[:, None], index[None, :], X[:, :, None], X[:, None, :]].sum(axis=(1, 2)) / 2
+        return unary + pairwise
+
+    def cost(self, x):
+        """Coût total d'une affectation x (tableau d'indices de taxis, un par tâche)."""
+        return float(self.costs(x)[0])
+
+    def local_costs(self, x):
+        """Tableau (tâches, taxis) : coût de chaque valeur pour chaque variable, les autres étant fixées par x."""
+        index = np.arange(len(x))
+        return self.unary + self.pairwise[index, :, x, :].sum(axis=0)
+
+    def assignment(self, x):
+        """Traduit une affectation en dictionnaire au format de pydcop {'Tache_<id>': 'T<id>'}."""
+        return {variable: self.values[k] for variable, k in zip(self.variables, x)}
+
+    def save(self, path):
+        """Sauvegarde le modèle dans un fichier binaire compressé (.npz) pour le réutiliser."""
+        np.savez_compressed(path, variables=np.array(self.variables), values=np.array(self.values),
+                            unary=self.unary, pairwise=self.pairwise)
+
+    @classmethod
+    def load(cls, path):
+        """Charge un modèle sauvegardé avec save()."""
+        with np.load(path) as data:
+            return cls(data["variables"].tolist(), data["values"].tolist(), data["unary"], data["pairwise"])
+
+    def to_yaml(self, nom):
+        """
+        Ecrit le modèle au format yaml de pydcop. Toutes les contraintes sont extensionnelles
+        (tables de coûts) : pydcop n'a aucune expression à interpréter.
+        """
+        with open(nom, "w") as f:
+            f.write("name: Allocation en ligne de taches \n")
+            f.write("objective: min \n")
+            f.write("\n")
+
+            #Ecriture des domaines dans le fichier yaml
+            f.write("domains: \n")
+            f.write("   taxis: \n")
+            f.write(f"      values: [{','.join(self.values)}]\n")
+            f.write("\n")
+
+            #Ecriture des variables dans le fichier yaml
+            f.write("variables: \n")
+            for variable in self.variables:
+                f.write(f"   {variable} : \n")
+                f.write("      domain: taxis \n")
+            f.write("\n")
+
+            f.write("constraints: \n")
+            # Coût unaire de chaque tâche : un vecteur de K coûts
+            for i, variable in enumerate(self.variables):
+                f.write(f"   cout_{variable}: \n")
+                f.write("      type: extensional \n")
+                f.write(f"      variables: {variable} \n")
+                entries = {}
+                for k, value in enumerate(self.values):
+                    entries.setdefault(self.unary[i, k], []).append(value)
+                write_values(f, entries)
+
+            # Coût de chaque couple de tâches : une matrice K x K, seules les entrées non nulles sont écrites
+            for i in range(len(self.variables)):
+                for j in range(i + 1, len(self.variables)):
+                    entries = {}
+                    for a, b in zip(*np.nonzero(self.pairwise[i, j])):
+                        entries.setdefault(self.pairwise[i, j, a, b], []).append(f"{self.values[a]} {self.values[b]}")
+                    if not entries:
+                        continue
+                    f.write(f"   couple_{self.variables[i]}_{self.variables[j]}: \n")
+                    f.write("      type: extensional \n")
+                    f.write(f"      variables: [{self.variables[i]}, {self.variables[j]}] \n")
+                    f.write("      default: 0 \n")
+                    write_values(f, entries)
+
+            f.write("agents: \n")
+            for variable in self.variables:
+                f.write(f"   {variable}: \n")
+                f.write("      capacity: 1 \n")
+
+
+def write_values(f, entries):
+    """Ecrit les valeurs d'une contrainte extensionnelle, les affectations de même coût étant regroupées."""
+    f.write("      values: \n")
+    for cout, assignments in entries.items():
+        f.write(f"         {cout}: {' | '.join(assignments)} \n")
+    f.write("\n")
+
+
+def solve_dpop(model, deadline=None):
+    """
+    DPOP sur le pseudo-arbre du graphe de contraintes. Toutes les tâches étant reliées deux à deux,
+    le pseudo-arbre est une chaîne Tache_0 - Tache_1 - ... et le message UTIL de la variable i porte
+    sur toutes ses ancêtres : la taille des tables est K^(i+1). Solution exacte.
+    Retourne None si la plus grande table dépasse config.DPOP_MAX_TABLE_SIZE.
+    DPOP n'ayant pas de solution intermédiaire, si deadline est dépassée pendant la phase UTIL,
+    chaque tâche prend simplement son taxi de moindre coût unaire.
+    """
+    num_variables, num_values = model.unary.shape
+    if num_values ** num_variables > config.DPOP_MAX_TABLE_SIZE:
+        print(f"DPOP : table UTIL trop grande ({num_values}^{num_variables} entrées)")
+        return None
+
+    # Phase UTIL : des feuilles vers la racine
+    message = np.zeros(())
+    best_values = [None] * num_variables
+    for i in range(num_variables - 1, -1, -1):
+        if expired(deadline):
+            return np.argmin(model.unary, axis=1)
+        # local a une dimension par variable 0..i
+        local = message + model.unary[i].reshape((1,) * i + (num_values,))
+        for a in range(i):
+            shape = [1] * (i + 1)
+            shape[a] = num_values
+            shape[i] = num_values
+            local = local + model.pairwise[a, i].reshape(shape)
+        best_values[i] = np.argmin(local, axis=-1)
+        message = np.min(local, axis=-1)
+
+    # Phase VALUE : de la racine vers les feuilles
+    x = []
+    for i in range(num_variables):
+        x.append(int(best_values[i][tuple(x)]))
+    return np.array(x, dtype=int)
+
+
+def solve_dsa(model, rng, max_cycles=None, probability=None, deadline=None):
+    """
+    DSA (Distributed Stochastic Algorithm), variante B : à chaque cycle synchrone, avec une probabilité
+    donnée, chaque variable qui peut améliorer son coût local prend sa meilleure valeur, et chaque variable
+    qui ne le peut pas mais est en conflit (coût binaire non nul : sa tâche partage un taxi) prend une
+    autre valeur de même coût local, s'il y en a une, tirée au hasard. Ces déplacements à coût égal
+    permettent de sortir des plateaux. Solution approchée.
+    Les cycles s'arrêtent à deadline : la meilleure affectation rencontrée est retournée.
+    """
+    if max_cycles is None:
+        max_cycles = config.DCOP_MAX_CYCLES
+    if probability is None:
+        probability = config.DSA_PROBABILITY
+    num_variables, num_values = model.unary.shape
+    index = np.arange(num_variables)
+    x = rng.integers(num_values, size=num_variables)
+    best_x, best_cost = x.copy(), model.cost(x)
+
+    for _ in range(max_cycles):
+        if expired(deadline):
+            break
+        local = model.local_costs(x)
+        current = local[index, x]
+        best_local = np.argmin(local, axis=1)
+        gain = current - local[index, best_local]
+        improving = gain > 1e-9
+        # Valeurs de même coût local que la valeur courante (autres que celle-ci)
+        tied = np.abs(local - current[:, None]) <= 1e-9
+        tied[index, x] = False
+        conflict = current - model.unary[index, x] > 1e-9
+        sideways = ~improving & conflict & tied.any(axis=1)
+        if not (improving | sideways).any():
+            break # Ni amélioration ni déplacement à coût égal possible : minimum local
+        move = (improving | sideways) & (rng.random(num_variables) < probability)
+        if not move.any():
+            continue
+        # Valeur à coût égal tirée au hasard parmi les ex aequo
+        tie_value = np.argmax(np.where(tied, rng.random(local.shape), -1.0), axis=1)
+        x = np.where(move, np.where(improving, best_local, tie_value), x)
+        cost = model.cost(x)
+        if cost < best_cost:
+            best_x, best_cost = x.copy(), cost
+    return best_x
+
+
+def solve_mgm(model, max_cycles=None, deadline=None):
+    """
+    MGM (Maximum Gain Message) : à chaque cycle, chaque variable calcule le gain de son meilleur
+    changement et seule celle dont le gain est maximal parmi ses voisines change de valeur.
+    Le graphe étant complet, une seule variable change par cycle (égalités départagées par l'indice).
+    Le coût décroît strictement jusqu'à un minimum local : l'affectation courante est la meilleure
+    rencontrée, et elle est retournée si deadline est dépassée.
+    """
+    if max_cycles is None:
+        max_cycles = config.DCOP_MAX_CYCLES
+    num_variables, _ = model.unary.shape
+    x = np.argmin(model.unary, axis=1)
+    index = np.arange(num_variables)
+
+    for _ in range(max_cycles):
+        if expired(deadline):
+            break
+        local = model.local_costs(x)
+        best_local = np.argmin(local, axis=1)
+        gain = local[index, x] - local[index, best_local]
+        winner = int(np.argmax(gain))
+        if gain[winner] <= 1e-9:
+            break
+        x[winner] = best_local[winner]
+    return x
+
+
+def solve(model, algo, rng=None, deadline=None):
+    """
+    Résout le modèle avec l'algorithme choisi (dpop, dsa ou mgm), en s'arrêtant à deadline
+    (échéance au sens de time.perf_counter, None : pas de limite).
+    Retourne un dictionnaire au format de pydcop {'assignment': {...}, 'cost': ...}, ou None en cas d'échec.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if not model.variables:
+        return {"assignment": {}, "cost": 0.0}
+    match algo:
+        case "dpop":
+            x = solve_dpop(model, deadline)
+        case "dsa":
+            x = solve_dsa(model, rng, deadline=deadline)
+        case "mgm":
+            x = solve_mgm(model, deadline=deadline)
+        case _:
+            print("Algorithme DCOP non reconnu :", algo)
+            return None
+    if x is None:
+        return None
+    return {"assignment": model.assignment(x), "cost": model.cost(x)}
@@ -0,0 +1,58 @@
+import math
+
+
+class DistanceCache:
+    """
+    Distances entre tâches partagées par les planificateurs et les allocateurs d'une simulation.
+    La longueur d'un trajet est gardée sur la tâche (Task.length) ; ce cache garde les trajets
+    à vide d(a.destination, b.start) entre deux tâches, indexés par leurs clés internes (Task.key, uniques
+    même pour des tâches sans id ou aux ids répétés).
+    Les entrées d'une tâche sont supprimées quand elle est terminée (retire) : le cache ne contient
+    que des couples de tâches en cours.
+    Les distances depuis la position d'un taxi ne sont pas gardées, elle change à chaque pas.
+    """
+    def __init__(self):
+        self.hops = {} # Dictionnaire de la forme {clé de a: {clé de b: d(a.destination, b.start)}}
+        self.into = {} # Dictionnaire de la forme {clé de b: ensemble des clés a telles que hops[a][b] existe}
+
+    def __len__(self):
+        return sum(len(row) for row in self.hops.values())
+
+    def hop(self, a, b):
+        """Distance entre la destination de la tâche a et le départ de la tâche b."""
+        row = self.hops.get(a.key)
+        if row is None:
+            row = self.hops[a.key] = {}
+        distance = row.get(b.key)
+        if distance is None:
+            distance = row[b.key] = math.dist(a.destination, b.start)
+            self.into.setdefault(b.key, set()).add(a.key)
+        return distance
+
+    def hop_table(self, tasks):
+        """Matrice hop[i][j] = d(tasks[i].destination, tasks[j].start), seules les entrées absentes sont calculées."""
+        return [[self.hop(a, b) for b in tasks] for a in tasks]
+
+    def queue_cost(self, tasks):
+        """Coût de la file de tâches réalisée dans l'ordre, à partir du départ de la première."""
+        if not tasks:
+            return 0.0
+        cost = tasks[0].length
+        for prev, task in zip(tasks, tasks[1:]):
+            cost += self.hop(prev, task) + task.length
+        return cost
+
+    def retire(self, task):
+        """Supprime les distances de la tâche terminée task."""
+        for b in self.hops.pop(task.key, {}):
+            sources = self.into.get(b)
+            if sources is not None:
+                sources.discard(task.key)
+                if not sources:
+                    del self.into[b]
+        for a in self.into.pop(task.key, ()):
+            row = self.hops.get(a)
+            if row is not None:
+                row.pop(task.key, None)
+                if not row:
+                    del self.hops[a]
@@ -0,0 +1,146 @@
+import heapq
+import math
+import time
+import config
+from simulation import Simulation
+
+
+class EventDrivenSimulation:
+    """
+    Noyau de simulation à événements discrets.
+    Au lieu d'avancer tous les taxis de quelques pixels à chaque image, on garde un tas des
+    prochains événements :
+       - génération et allocation de tâches, tous les task_interval millisecondes ou à l'arrivée
+         de chaque tâche selon le processus d'arrivée (Simulation.next_allocation_time) ;
+       - arrivée de chaque taxi à son prochain waypoint, calculée avec sa vitesse (Fleet.speeds).
+    Le temps saute directement d'un événement au suivant. Entre deux événements un taxi va en
+    ligne droite à vitesse constante : sa position n'est interpolée que lorsqu'on en a besoin
+    (allocation des tâches, affichage), avec sync().
+    """
+    SPAWN = 0
+    ARRIVAL = 1
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.now = 0.0            # Temps simulé courant (en ms)
+        self.events = []          # Tas de la forme [(temps, numéro, type, indice du taxi, version)...]
+        self.counter = 0          # Numéro d'ordre des événements, pour départager les égalités
+        self.num_events = 0       # Nombre d'événements traités
+        # Pour chaque taxi : début du trajet en cours (temps, position) et version de son événement d'arrivée
+        self.leg_start = [(0.0, taxi.position) for taxi in sim.taxis]
+        self.versions = [0] * len(sim.taxis)
+        self.push(0.0 if sim.arrivals.periodic else sim.next_allocation_time(), self.SPAWN)
+
+    def push(self, event_time, kind, k=None, version=None):
+        if event_time is None: # Plus de tâches à venir
+            return
+        heapq.heappush(self.events, (event_time, self.counter, kind, k, version))
+        self.counter += 1
+
+    def position_at(self, k, current_time):
+        """Position interpolée du taxi k à current_time (en ms), sans modifier son état."""
+        taxi = self.sim.taxis[k]
+        start_time, start_pos = self.leg_start[k]
+        if taxi.target_index >= len(taxi.route):
+            return start_pos
+        target = taxi.route[taxi.target_index]
+        distance = math.dist(start_pos, target)
+        if distance == 0:
+            return target
+        speed = float(self.sim.fleet.speeds[taxi.index]) # Même vitesse que Taxi.next_arrival_delay
+        travelled = min(distance, speed * (current_time - start_time) / 1000)
+        ratio = travelled / distance
+        return (start_pos[0] + (target[0] - start_pos[0]) * ratio, start_pos[1] + (target[1] - start_pos[1]) * ratio)
+
+    def sync(self, current_time=None):
+        """Met à jour la position de tous les taxis au temps current_time (par défaut le temps courant)."""
+        if current_time is None:
+            current_time = self.now
+        for k, taxi in enumerate(self.sim.taxis):
+            taxi.position = self.position_at(k, current_time)
+            self.leg_start[k] = (current_time, taxi.position)
+
+    def schedule_arrival(self, k):
+        """(Re)programme l'arrivée du taxi k à son waypoint courant ; l'ancien événement devient obsolète."""
+        self.versions[k] += 1
+        taxi = self.sim.taxis[k]
+        self.leg_start[k] = (self.now, taxi.position)
+        delay = taxi.next_arrival_delay()
+        if delay is not None:
+            self.push(self.now + delay * 1000, self.ARRIVAL, k, self.versions[k])
+
+    def is_finished(self):
+        return not self.sim.arrivals and not any(taxi.tasks for taxi in self.sim.taxis)
+
+    def step(self):
+        """Traite le prochain événement. Retourne False s'il n'y en a plus."""
+        if not self.events:
+            return False
+        event_time, _, kind, k, version = heapq.heappop(self.events)
+        if kind == self.ARRIVAL and version != self.versions[k]:
+            return True # Evénement obsolète : la route du taxi a changé depuis
+        self.now = event_time
+        self.num_events += 1
+
+        profiler = self.sim.profiler
+        if kind == self.SPAWN:
+            # Les allocateurs lisent la position des taxis : on les interpole au temps courant
+            with profiler.span("deplacement", "movement"):
+                self.sync()
+            self.sim.spawn_tasks(self.now)
+            with profiler.span("deplacement", "movement"):
+                for k in range(len(self.sim.taxis)):
+                    self.schedule_arrival(k)
+            self.push(self.sim.next_allocation_time(), self.SPAWN)
+        else:
+            with profiler.span("deplacement", "movement"):
+                done = self.sim.taxis[k].reach_waypoint(self.now)
+                if done is not None:
+                    self.sim.record_completion(done)
+                self.schedule_arrival(k)
+        return True
+
+    def run(self, max_time=None):
+        """Traite les événements jusqu'à ce qu'il n'y ait plus de tâches, ou jusqu'à max_time secondes simulées."""
+        while not (self.sim.mean_route_cost and self.is_finished()):
+            if max_time is not None and self.events and self.events[0][0] > max_time * 1000:
+                break
+            if not self.step():
+                break
+        self.sync()
+
+
+def run_event_driven(resolutionType, isPenalty=False, random_task=False, algo="none", max_time=None,
+                     num_taxis=None, num_tasks_spawn=None, seed=None, task_file="task_created.json",
+                     arrival=None, reoptimize=None, profile=None):
+    """
+    Equivalent de headless.run_headless avec le noyau à événements discrets :
+    le coût de la simulation dépend du nombre d'événements et non plus du nombre d'images.
+    """
+    if num_taxis is None:
+        num_taxis = config.NUM_TAXIS
+    if num_tasks_spawn is None:
+        num_tasks_spawn = config.NUM_TASKS_SPAWN
+    sim = Simulation(config.WIDTH, config.HEIGHT, num_taxis, config.TASK_INTERVAL, num_tasks_spawn, resolutionType, isPenalty, random_task, algo, seed,
+                     task_file, arrival, reoptimize, profile)
+    kernel = EventDrivenSimulation(sim)
+
+    wall_start = time.perf_counter()
+    kernel.run(max_time)
+    wall_time = time.perf_counter() - wall_start
+    sim.close()
+
+    result = sim.summary()
+    result["time"] = kernel.now / 1000 # Temps simulé (en secondes)
+    result["debit (taches par minute)"] = 60 * result["taches terminees"] / result["time"] if result["time"] else 0.0
+    result["wall time"] = wall_time    # Temps de calcul réel (en secondes)
+    result["events"] = kernel.num_events
+    return result
+
+
+if __name__ == "__main__":
+    for resolutionType in ["greedy", "PSI", "SSI", "regret", "optimal"]:
+        result = run_event_driven(resolutionType, isPenalty=True, random_task=False)
+        print(f"{resolutionType} : {result['taches terminees']} tâches en {result['time']:.1f}s simulées, "
+              f"{result['events']} événements, {result['wall time']:.3f}s de calcul, "
+              f"coût moyen {result['moyenne du cout de route']:.1f}")
@@ -0,0 +1,186 @@
+import numpy as np
+import config
+
+
+# Tableaux de Fleet ayant une ligne par taxi
+ARRAYS = ("positions", "speeds", "target_index", "route_len", "routes", "working",
+          "queue_len", "first_start", "queue_cost", "completed")
+
+
+class Fleet:
+    """
+    État de toute la flotte stocké dans des tableaux NumPy contigus (structure de tableaux),
+    une ligne par taxi, plutôt que dans des attributs (tuples et listes) de chaque objet Taxi :
+       - positions[k]  : position (x, y) du taxi k
+       - speeds[k]     : vitesse (pixels par seconde)
+       - target_index[k] : indice du waypoint courant dans la route
+       - routes[k, :route_len[k]] : waypoints de la route [start, destination, start, destination, ...]
+       - working[k], completed[k] : isWorking et completed_tasks
+       - queue_len[k], first_start[k], queue_cost[k] : nombre de tâches de la file, départ de la première
+         et coût de la file à partir de ce départ, tenus à jour par le taxi à chaque modification de sa file
+    Les objets Taxi ne sont plus que des vues sur une ligne de ces tableaux, ce qui permet de mettre
+    à jour toute la flotte en une seule opération.
+    """
+    def __init__(self, capacity=0, route_capacity=8):
+        self.size = 0
+        self.positions = np.zeros((capacity, 2))
+        self.speeds = np.zeros(capacity)
+        self.target_index = np.zeros(capacity, dtype=np.int32)
+        self.route_len = np.zeros(capacity, dtype=np.int32)
+        self.routes = np.zeros((capacity, route_capacity, 2))
+        self.working = np.zeros(capacity, dtype=bool)
+        self.queue_len = np.zeros(capacity, dtype=np.int32)
+        self.first_start = np.zeros((capacity, 2))
+        self.queue_cost = np.zeros(capacity)
+        self.completed = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, capacity):
+        """Agrandit les tableaux (par doublement) pour contenir capacity taxis."""
+        new = max(capacity, 2 * len(self.speeds))
+        for name in ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((new,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def copy(self):
+        """Copie indépendante de l'état des taxis (les tableaux sont réduits à size lignes)."""
+        fleet = Fleet.__new__(Fleet)
+        fleet.size = self.size
+        for name in ARRAYS:
+            setattr(fleet, name, getattr(self, name)[:self.size].copy())
+        return fleet
+
+    def reserve_route(self, length):
+        """Agrandit (par doublement) le nombre de waypoints que peut contenir chaque route."""
+        capacity = self.routes.shape[1]
+        if length <= capacity:
+            return
+        routes = np.zeros((len(self.routes), max(length, 2 * capacity), 2))
+        routes[:, :capacity] = self.routes
+        self.routes = routes
+
+    def add(self, position, speed=None):
+        """Ajoute un taxi à la flotte et retourne son indice."""
+        if self.size == len(self.speeds):
+            self._grow(self.size + 1)
+        k = self.size
+        self.size += 1
+        self.positions[k] = position
+        self.speeds[k] = config.TAXI_SPEED if speed is None else speed
+        return k
+
+    def set_route(self, k, points):
+        """Remplace la route du taxi k par la liste de points donnée."""
+        self.reserve_route(len(points))
+        if points:
+            self.routes[k, :len(points)] = points
+        self.route_len[k] = len(points)
+
+    def extend_route(self, k, points):
+        """Ajoute des points à la fin de la route du taxi k."""
+        n = self.route_len[k]
+        self.reserve_route(n + len(points))
+        if points:
+            self.routes[k, n:n + len(points)] = points
+        self.route_len[k] = n + len(points)
+
+
+    def route_costs(self):
+        """
+        Coût restant de la file de chaque taxi (Taxi.current_route_cost) :
+        distance(position, départ de la première tâche) + coût de la file, 0 si la file est vide.
+        """
+        n = self.size
+        delta = self.first_start[:n] - self.positions[:n]
+        return np.where(self.queue_len[:n] > 0, np.hypot(delta[:, 0], delta[:, 1]) + self.queue_cost[:n], 0.0)
+
+    def step(self, dt):
+        """
+        Fait avancer tous les taxis vers leur waypoint courant en une seule opération (équivalent
+        vectorisé de Taxi.update pour toute la flotte). Un taxi atteint son waypoint s'il en est
+        à moins d'un pixel ou s'il peut l'atteindre pendant dt ; il y est alors placé et passe au suivant.
+        Retourne les indices des taxis qui viennent d'atteindre un départ (prise en charge, Taxi.pick_up)
+        et ceux qui viennent d'atteindre une destination (tâche terminée) : la mise à jour de leur file
+        et leur replanification restent à faire (Taxi.complete_task).
+        """
+        n = self.size
+        target_index = self.target_index[:n]
+        route_len = self.route_len[:n]
+        positions = self.positions[:n]
+
+        active = np.flatnonzero(target_index < route_len) # Taxis qui ont encore un waypoint à atteindre
+        if active.size == 0:
+            return active, active
+        index = target_index[active]
+        targets = self.routes[active, index]
+        delta = targets - positions[active]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        move_distance = self.speeds[active] * dt
+
+        arrived = (distance < 1) | (move_distance >= distance)
+        moving = active[~arrived]
+        ratio = move_distance[~arrived] / distance[~arrived]
+        positions[moving] += delta[~arrived] * ratio[:, None]
+        self.working[moving] = index[~arrived] % 2 == 1
+
+        reached = active[arrived]
+        positions[reached] = targets[arrived]
+        index = index[arrived] + 1
+        target_index[reached] = index
+        self.working[reached] = (index < route_len[reached]) & (index % 2 == 1)
+        # Comme la route est [start, destination, start, destination, ...], atteindre un point d'indice impair termine une tâche
+        return reached[index % 2 == 1], reached[index % 2 == 0]
+
+
+class FleetSnapshot:
+    """
+    Instantané de ce qu'affiche renderer.Renderer (voir Simulation.snapshot) : une copie de la flotte,
+    l'identifiant de chaque taxi et, pour chacun, les tâches de sa file [(identifiant, départ)...].
+    Il n'est plus modifié une fois créé et peut donc être dessiné pendant que la simulation avance.
+    """
+    __slots__ = ("fleet", "ids", "tasks")
+
+    def __init__(self, fleet, ids, tasks):
+        self.fleet = fleet
+        self.ids = ids
+        self.tasks = tasks
+
+
+class RouteView:
+    """
+    Vue sur la route d'un taxi dans Fleet.routes, utilisable comme la liste de tuples d'origine
+    (len, indexation, tranches, itération, extend, append).
+    """
+    __slots__ = ("fleet", "k")
+
+    def __init__(self, fleet, k):
+        self.fleet = fleet
+        self.k = k
+
+    def __len__(self):
+        return int(self.fleet.route_len[self.k])
+
+    def __getitem__(self, i):
+        points = self.fleet.routes[self.k, :self.fleet.route_len[self.k]]
+        if isinstance(i, slice):
+            return [tuple(point) for point in points[i].tolist()]
+        return tuple(points[i].tolist())
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def extend(self, points):
+        self.fleet.extend_route(self.k, list(points))
+
+    def append(self, point):
+        self.fleet.extend_route(self.k, [point])
+
+    def __eq__(self, other):
+        return self[:] == [tuple(point) for point in other]
+
+    def __repr__(self):
+        return repr(self[:])
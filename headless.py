@@ -0,0 +1,58 @@
+import time
+import config
+from simulation import Simulation
+
+
+def run_headless(resolutionType, isPenalty=False, random_task=False, algo="none", dt=None, max_time=None,
+                 num_taxis=None, num_tasks_spawn=None, seed=None, task_file="task_created.json", arrival=None,
+                 reoptimize=None, profile=None):
+    """
+    Exécute une simulation sans affichage (pygame n'est pas importé).
+    Le temps simulé avance par pas fixes de dt secondes (1/FPS par défaut, comme dans main())
+    et non plus selon l'horloge réelle : la simulation tourne aussi vite que le permet le CPU.
+
+    La boucle s'arrête comme main() quand il n'y a plus de tâches à générer ni à réaliser,
+    ou quand le temps simulé atteint max_time secondes (nécessaire avec random_task=True).
+    num_taxis et num_tasks_spawn remplacent les valeurs de config.py, seed fixe la génération aléatoire.
+    task_file est le fichier des tâches prédéfinies (json, jsonl, csv ou trace binaire, voir sources.py)
+    et arrival le processus d'arrivée des tâches (config.ARRIVAL_MODE par défaut, voir arrivals.py).
+    Retourne un dictionnaire avec les mêmes métriques que main().
+    """
+    if dt is None:
+        dt = 1 / config.FPS
+    if num_taxis is None:
+        num_taxis = config.NUM_TAXIS
+    if num_tasks_spawn is None:
+        num_tasks_spawn = config.NUM_TASKS_SPAWN
+
+    sim = Simulation(config.WIDTH, config.HEIGHT, num_taxis, config.TASK_INTERVAL, num_tasks_spawn, resolutionType, isPenalty, random_task, algo, seed,
+                     task_file, arrival, reoptimize, profile)
+
+    wall_start = time.perf_counter()
+    current_time = 0.0 # Temps simulé (en ms)
+    step = 0
+    tasks_left = True
+    while sim.arrivals or tasks_left:
+        if max_time is not None and current_time >= max_time * 1000:
+            break
+        current_time += dt * 1000
+        sim.update(current_time, dt)
+        step += 1
+        tasks_left = any(taxi.tasks for taxi in sim.taxis)
+
+    wall_time = time.perf_counter() - wall_start
+    sim.close()
+
+    result = sim.summary()
+    result["time"] = current_time / 1000 # Temps simulé (en secondes)
+    result["debit (taches par minute)"] = 60 * result["taches terminees"] / result["time"] if result["time"] else 0.0
+    result["wall time"] = wall_time      # Temps de calcul réel (en secondes)
+    result["steps"] = step
+    return result
+
+
+if __name__ == "__main__":
+    for resolutionType in ["greedy", "PSI", "SSI", "regret", "optimal"]:
+        result = run_headless(resolutionType, isPenalty=True, random_task=False)
+        print(f"{resolutionType} : {result['taches terminees']} tâches en {result['time']:.1f}s simulées, "
+              f"{result['wall time']:.3f}s de calcul, coût moyen {result['moyenne du cout de route']:.1f}")
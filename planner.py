@@ -0,0 +1,301 @@
+import math
+import config
+
+
+def build_distance_table(position, tasks, distances=None):
+    """
+    Précalcule les distances utilisées par le planificateur :
+       - approach[i] : distance(position, tâche_i.start)
+       - length[i]   : distance(tâche_i.start, tâche_i.destination) (Task.length)
+       - hop[i][j]   : distance(tâche_i.destination, tâche_j.start), lue dans distances
+                       (un distances.DistanceCache) s'il est donné
+    """
+    approach = [math.dist(position, task.start) for task in tasks]
+    length = [task.length for task in tasks]
+    if distances is not None:
+        hop = distances.hop_table(tasks)
+    else:
+        hop = [[math.dist(a.destination, b.start) for b in tasks] for a in tasks]
+    return approach, length, hop
+
+
+def order_cost(order, approach, length, hop):
+    """Coût d'un ordre (liste d'indices) avec la table de distances précalculée."""
+    if not order:
+        return 0
+    cost = approach[order[0]] + length[order[0]]
+    for prev, nxt in zip(order, order[1:]):
+        cost += hop[prev][nxt] + length[nxt]
+    return cost
+
+
+def held_karp(approach, length, hop, upper_bound=float('inf')):
+    """
+    Planification exacte par programmation dynamique sur les sous-ensembles (Held-Karp).
+    best[mask][j] = coût minimal pour réaliser les tâches de mask en terminant par la tâche j.
+    Les états dont le coût dépasse upper_bound sont ignorés.
+    Complexité O(2^n * n^2) au lieu de O(n! * n) pour les permutations.
+    """
+    n = len(approach)
+    full = (1 << n) - 1
+    inf = float('inf')
+    best = [[inf] * n for _ in range(1 << n)]
+    parent = [[-1] * n for _ in range(1 << n)]
+    for j in range(n):
+        cost = approach[j] + length[j]
+        if cost <= upper_bound:
+            best[1 << j][j] = cost
+
+    for mask in range(1, full + 1):
+        row = best[mask]
+        for j in range(n):
+            cost = row[j]
+            if cost == inf:
+                continue
+            hop_j = hop[j]
+            for k in range(n):
+                bit = 1 << k
+                if mask & bit:
+                    continue
+                new_cost = cost + hop_j[k] + length[k]
+                if new_cost > upper_bound:
+                    continue
+                if new_cost < best[mask | bit][k]:
+                    best[mask | bit][k] = new_cost
+                    parent[mask | bit][k] = j
+
+    # Reconstruction de l'ordre optimal à partir de la dernière tâche
+    last = min(range(n), key=lambda j: best[full][j])
+    best_cost = best[full][last]
+    if best_cost == inf:
+        return None, inf
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last)
+        prev = parent[mask][last]
+        mask &= ~(1 << last)
+        last = prev
+    order.reverse()
+    return order, best_cost
+
+
+def cheapest_insertion(order, index, approach, length, hop):
+    """Retourne (surcoût, position) de la meilleure insertion de la tâche index dans order."""
+    if not order:
+        return approach[index] + length[index], 0
+    # Insertion en tête : on remplace l'approche de la première tâche
+    first = order[0]
+    best_delta = approach[index] + length[index] + hop[index][first] - approach[first]
+    best_pos = 0
+    for pos in range(1, len(order) + 1):
+        prev = order[pos - 1]
+        delta = hop[prev][index] + length[index]
+        if pos < len(order):
+            nxt = order[pos]
+            delta += hop[index][nxt] - hop[prev][nxt]
+        if delta < best_delta:
+            best_delta = delta
+            best_pos = pos
+    return best_delta, best_pos
+
+
+def nearest_insertion(approach, length, hop, order=None, pending=None):
+    """
+    Construction gloutonne : à chaque étape on insère la tâche non planifiée
+    dont l'insertion (à sa meilleure position) coûte le moins. O(n^3).
+    """
+    order = list(order) if order else []
+    pending = list(pending) if pending is not None else list(range(len(approach)))
+    while pending:
+        best = None
+        for index in pending:
+            delta, pos = cheapest_insertion(order, index, approach, length, hop)
+            if best is None or delta < best[0]:
+                best = (delta, pos, index)
+        _, pos, index = best
+        order.insert(pos, index)
+        pending.remove(index)
+    return order
+
+
+def hop_prefix_sums(order, hop):
+    """
+    Sommes préfixes des trajets à vide le long de order, dans le sens de parcours (forward)
+    et en sens inverse (backward) : forward[j] - forward[i] est le coût des trajets à vide
+    de order[i] à order[j], backward[j] - backward[i] celui du même segment parcouru à l'envers.
+    """
+    forward = [0.0]
+    backward = [0.0]
+    for prev, nxt in zip(order, order[1:]):
+        forward.append(forward[-1] + hop[prev][nxt])
+        backward.append(backward[-1] + hop[nxt][prev])
+    return forward, backward
+
+
+def local_search(order, approach, length, hop, max_passes=None):
+    """
+    Amélioration locale de l'ordre par 2-opt (inversion d'un segment) et or-opt
+    (déplacement d'un bloc de 1 à 3 tâches). Chaque mouvement est évalué en O(1) par la
+    variation de coût qu'il induit (les longueurs des tâches ne changent pas), avec des sommes
+    préfixes pour les segments inversés par 2-opt : une passe coûte O(n^2), et le nombre
+    de passes est borné pour garder un temps de calcul prévisible.
+    """
+    if max_passes is None:
+        max_passes = config.PLANNING_LOCAL_SEARCH_PASSES
+    best = list(order)
+    best_cost = order_cost(best, approach, length, hop)
+    n = len(best)
+
+    def link(a, b):
+        """Trajet à vide de la tâche a à la tâche b (depuis la position si a est None, nul si b est None)."""
+        if b is None:
+            return 0.0
+        if a is None:
+            return approach[b]
+        return hop[a][b]
+
+    for _ in range(max_passes):
+        improved = False
+        # 2-opt : les tâches sont orientées, l'inversion change aussi le sens des trajets à vide du segment
+        forward, backward = hop_prefix_sums(best, hop)
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                before = best[i - 1] if i > 0 else None
+                after = best[j + 1] if j + 1 < n else None
+                delta = (link(before, best[j]) + link(best[i], after) - link(before, best[i]) - link(best[j], after)
+                         + backward[j] - backward[i] - forward[j] + forward[i])
+                if delta < -1e-9:
+                    best = best[:i] + best[i:j + 1][::-1] + best[j + 1:]
+                    best_cost = order_cost(best, approach, length, hop)
+                    forward, backward = hop_prefix_sums(best, hop)
+                    improved = True
+        # or-opt : on retire un bloc et on le réinsère ailleurs
+        for size in (1, 2, 3):
+            for i in range(n - size + 1):
+                block = best[i:i + size]
+                rest = best[:i] + best[i + size:]
+                first, last = block[0], block[-1]
+                before = best[i - 1] if i > 0 else None
+                after = best[i + size] if i + size < n else None
+                # Coût de l'ordre sans le bloc (les candidats sont construits à partir de rest)
+                base_cost = best_cost - link(before, first) - link(last, after) + link(before, after)
+                for pos in range(len(rest) + 1):
+                    if pos == i:
+                        continue
+                    prev = rest[pos - 1] if pos > 0 else None
+                    nxt = rest[pos] if pos < len(rest) else None
+                    cost = base_cost + link(prev, first) + link(last, nxt) - link(prev, nxt)
+                    if cost < best_cost - 1e-9:
+                        best = rest[:pos] + block + rest[pos:]
+                        best_cost = order_cost(best, approach, length, hop)
+                        improved = True
+        if not improved:
+            break
+    return best, best_cost
+
+
+def plan_order(position, tasks, distances=None):
+    """
+    Calcule le meilleur ordre des tâches depuis position.
+    - En dessous de config.MAX_EXACT_PLANNING_TASKS tâches : Held-Karp (exact).
+    - Au-delà : insertion la plus proche puis 2-opt / or-opt (heuristique bornée).
+    Retourne (liste ordonnée des tâches, coût).
+    """
+    if not tasks:
+        return [], 0
+    approach, length, hop = build_distance_table(position, tasks, distances)
+    if len(tasks) <= config.MAX_EXACT_PLANNING_TASKS:
+        order, cost = held_karp(approach, length, hop)
+    else:
+        order = nearest_insertion(approach, length, hop)
+        order, cost = local_search(order, approach, length, hop)
+    return [tasks[i] for i in order], cost
+
+
+class RoutePlanner:
+    """
+    Planificateur incrémental associé à un taxi.
+    Il garde le dernier ordre planifié et son coût pour éviter de tout recalculer :
+       - quand la première tâche est terminée, le suffixe d'un ordre optimal reste optimal
+         depuis la destination de cette tâche, on le réutilise tel quel ;
+       - quand des tâches sont ajoutées, on part de l'ancien ordre (démarrage à chaud) en
+         insérant les nouvelles tâches à leur meilleure position. En mode exact, le coût de
+         cet ordre sert de borne supérieure pour élaguer Held-Karp.
+    Le suffixe n'est réutilisé tel quel que si l'ordre gardé est exact (exact) : un ordre obtenu par
+    l'heuristique est réoptimisé (Held-Karp) dès que le nombre de tâches repasse sous
+    config.MAX_EXACT_PLANNING_TASKS.
+    """
+    __slots__ = ("order", "cost", "origin", "exact", "distances")
+
+    def __init__(self, distances=None):
+        self.order = []      # Dernier ordre planifié (liste de tâches)
+        self.cost = 0        # Coût de cet ordre depuis origin
+        self.origin = None   # Position depuis laquelle l'ordre a été planifié
+        self.exact = False   # L'ordre est optimal (Held-Karp), et son suffixe l'est donc aussi
+        self.distances = distances # Cache des distances entre tâches (distances.DistanceCache), optionnel
+
+    def reset(self):
+        self.order = []
+        self.cost = 0
+        self.origin = None
+        self.exact = False
+
+    def complete_first(self, task):
+        """La tâche task vient d'être terminée : si c'était la tête du plan, on garde le suffixe."""
+        if not self.order or self.order[0] is not task:
+            self.reset()
+            return
+        self.order.pop(0)
+        self.cost -= math.dist(self.origin, task.start) + task.length
+        self.origin = tuple(task.destination)
+
+    def plan(self, position, tasks):
+        """Retourne (liste ordonnée des tâches, coût), en réutilisant le plan précédent si possible."""
+        if not tasks:
+            self.reset()
+            return [], 0
+        # Les points lus dans un fichier json sont des listes : on compare les positions sous forme de tuples
+        position = tuple(position)
+
+        known = {id(task) for task in self.order}
+        current = {id(task) for task in tasks}
+
+        exact_size = len(tasks) <= config.MAX_EXACT_PLANNING_TASKS
+        if not self.order or not known <= current:
+            # Des tâches ont disparu sans passer par complete_first : on replanifie entièrement
+            self.order, self.cost = plan_order(position, tasks, self.distances)
+            self.exact = exact_size
+        elif known == current and self.origin == position and (self.exact or not exact_size):
+            # Rien n'a changé depuis le dernier plan (cas typique après une dépose) : son suffixe est
+            # optimal s'il était exact ; sinon, au-delà du seuil, l'heuristique n'en promet pas plus
+            return list(self.order), self.cost
+        else:
+            self.order, self.cost, self.exact = self._warm_start(position, tasks, known)
+
+        self.origin = position
+        return list(self.order), self.cost
+
+    def _warm_start(self, position, tasks, known):
+        """
+        Replanification à partir de l'ancien ordre, les nouvelles tâches étant insérées une à une.
+        L'ordre obtenu est ensuite amélioré comme dans plan_order : Held-Karp jusqu'au seuil,
+        2-opt / or-opt au-delà. Retourne (liste ordonnée des tâches, coût, ordre exact).
+        """
+        new_tasks = [task for task in tasks if id(task) not in known]
+        all_tasks = self.order + new_tasks
+        approach, length, hop = build_distance_table(position, all_tasks, self.distances)
+        order = nearest_insertion(approach, length, hop,
+                                  order=range(len(self.order)),
+                                  pending=range(len(self.order), len(all_tasks)))
+        cost = order_cost(order, approach, length, hop)
+
+        exact = False
+        if len(all_tasks) <= config.MAX_EXACT_PLANNING_TASKS:
+            exact_order, exact_cost = held_karp(approach, length, hop, upper_bound=cost + 1e-9)
+            if exact_order is not None:
+                order, cost, exact = exact_order, exact_cost, True
+        else:
+            order, cost = local_search(order, approach, length, hop)
+
+        return [all_tasks[i] for i in order], cost, exact
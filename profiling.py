@@ -0,0 +1,131 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+
+class NullProfiler:
+    """Profiler inactif (par défaut) : les intervalles ne coûtent qu'un contexte vide."""
+    active = False
+
+    def count(self, name, n=1):
+        pass
+
+    def span(self, name, category="simulation", **args):
+        return nullcontext()
+
+    def allocation_round(self, strategy, current_time, num_tasks):
+        return nullcontext()
+
+    def totals(self):
+        return {}
+
+    def close(self, output=None):
+        pass
+
+
+class Profiler:
+    """
+    Instrumentation d'une simulation :
+       - durée des phases (allocation, déplacement, affichage...) sous forme d'intervalles, avec le thread
+         qui les exécute ;
+       - pour chaque tour d'allocation : stratégie, nombre de tâches, latence de décision et compteurs
+         des chemins critiques (offres évaluées, appels à plan_route, permutations explorées...).
+    Les compteurs sont propres à chaque Profiler : la simulation le transmet à ses taxis et à ses
+    moteurs d'offres, qui comptent avec "if profiler.active: profiler.count(...)". Plusieurs
+    simulations profilées peuvent donc tourner dans le même processus.
+    Exportable en json lines (write_jsonl) et au format Chrome trace (write_chrome_trace, lisible dans
+    chrome://tracing ou Perfetto). Avec cprofile, les tours d'allocation sont aussi profilés par cProfile
+    (write_cprofile, à lire avec pstats ou snakeviz).
+    """
+    active = True
+
+    def __init__(self, cprofile=False):
+        self.origin = time.perf_counter()
+        self.spans = []  # Liste de la forme [(nom, catégorie, début, durée, thread, arguments)...], en secondes
+        self.rounds = [] # Un dictionnaire par tour d'allocation
+        self.counters = Counter()       # Compteurs depuis le dernier relevé (Profiler.collect)
+        self.counter_totals = Counter() # Compteurs de toute la simulation (tours d'allocation et autres phases)
+        self.cprofile = cProfile.Profile() if cprofile else None
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    @contextmanager
+    def span(self, name, category="simulation", **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, category, start - self.origin, time.perf_counter() - start,
+                               threading.get_ident(), args))
+
+    @contextmanager
+    def allocation_round(self, strategy, current_time, num_tasks):
+        """Mesure un tour d'allocation de num_tasks tâches au temps simulé current_time (en ms)."""
+        self.collect()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            latency = time.perf_counter() - start
+            if self.cprofile is not None:
+                self.cprofile.disable()
+            self.spans.append(("allocation", "allocation", start - self.origin, latency, threading.get_ident(),
+                               {"strategy": strategy, "tasks": num_tasks}))
+            self.rounds.append({"round": len(self.rounds), "strategy": strategy, "time": current_time / 1000,
+                                "tasks": num_tasks, "latence de decision": latency, "compteurs": dict(self.counters)})
+            self.collect()
+
+    def collect(self):
+        """Ajoute les compteurs courants aux totaux et les remet à zéro."""
+        self.counter_totals.update(self.counters)
+        self.counters.clear()
+
+    def totals(self):
+        """Temps total (en secondes) passé dans chaque catégorie d'intervalles."""
+        totals = Counter()
+        for _, category, _, duration, _, _ in self.spans:
+            totals[category] += duration
+        return dict(totals)
+
+    def write_jsonl(self, path):
+        """
+        Une ligne par tour d'allocation ({"type": "round", ...}), puis une ligne de totaux : temps par phase
+        et compteurs de toute la simulation (plan_route est aussi appelé hors des tours, à la fin des tâches).
+        """
+        self.collect()
+        with open(path, "w") as f:
+            for round_ in self.rounds:
+                f.write(json.dumps({"type": "round", **round_}) + "\n")
+            f.write(json.dumps({"type": "totals", **self.totals(), "compteurs": dict(self.counter_totals)}) + "\n")
+
+    def write_chrome_trace(self, path):
+        """Trace au format Chrome (événements complets "X" en microsecondes, et compteurs "C" de chaque tour)."""
+        pid = os.getpid()
+        events = [{"name": name, "cat": category, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6,
+                   "pid": pid, "tid": tid, "args": args}
+                  for name, category, start, duration, tid, args in self.spans]
+        allocations = [span for span in self.spans if span[0] == "allocation"]
+        for round_, span in zip(self.rounds, allocations):
+            if round_["compteurs"]:
+                events.append({"name": "compteurs", "ph": "C", "ts": span[2] * 1e6, "pid": pid,
+                               "args": round_["compteurs"]})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def write_cprofile(self, path):
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(path)
+
+    def close(self, output=None):
+        """Si output est donné, écrit output.jsonl, output.trace.json (et output.prof)."""
+        if output is not None:
+            self.write_jsonl(f"{output}.jsonl")
+            self.write_chrome_trace(f"{output}.trace.json")
+            self.write_cprofile(f"{output}.prof")
@@ -0,0 +1,104 @@
+import numpy as np
+import pygame
+import config
+
+
+class Renderer:
+    """
+    Affichage de la simulation avec pygame, en ne redessinant que ce qui change :
+       - les polices sont créées une seule fois et le texte de chaque tâche et de chaque taxi n'est rendu
+         qu'une fois (surfaces en cache, par identifiant) ;
+       - le fond, les waypoints, les étiquettes des tâches et les segments entre waypoints forment une
+         couche statique, redessinée seulement quand une route change (routes, waypoint courant ou
+         état des taxis dans Fleet) ;
+       - tout est lu dans un instantané (fleet.FleetSnapshot, voir Simulation.snapshot), qui peut donc
+         être dessiné pendant que la simulation avance dans un autre thread (voir runner.py) ;
+       - à chaque image, seuls les éléments mobiles (taxis, leur étiquette et le segment vers leur
+         waypoint courant) sont effacés puis redessinés, et draw() retourne les rectangles modifiés
+         pour pygame.display.update.
+    """
+    def __init__(self, size):
+        self.task_font = pygame.font.SysFont(None, 20)
+        self.taxi_font = pygame.font.SysFont(None, 24)
+        self.task_labels = {} # Dictionnaire de la forme {identifiant de la tâche: surface du texte}
+        self.taxi_labels = {}
+        self.layer = pygame.Surface(size) # Couche statique
+        self.layer_state = None # Flotte de l'instantané du dernier dessin de la couche statique
+        self.dirty = []         # Rectangles des éléments mobiles de l'image précédente
+
+    def task_label(self, task_id):
+        if task_id not in self.task_labels:
+            self.task_labels[task_id] = self.task_font.render(f"Task {task_id}", True, config.BLACK)
+        return self.task_labels[task_id]
+
+    def taxi_label(self, taxi_id):
+        if taxi_id not in self.taxi_labels:
+            self.taxi_labels[taxi_id] = self.taxi_font.render(str(taxi_id), True, config.BLACK)
+        return self.taxi_labels[taxi_id]
+
+    def routes_changed(self, fleet):
+        """Vrai si les tableaux dont dépend la couche statique diffèrent de ceux de son dernier dessin."""
+        if self.layer_state is None:
+            return True
+        return any(getattr(fleet, name).shape != getattr(self.layer_state, name).shape
+                   or not np.array_equal(getattr(fleet, name), getattr(self.layer_state, name))
+                   for name in ("route_len", "target_index", "working", "queue_len", "routes"))
+
+    def draw_layer(self, snapshot):
+        """Dessine la couche statique : fond, segments entre waypoints, waypoints et étiquettes des tâches."""
+        fleet = snapshot.fleet
+        layer = self.layer
+        layer.fill(config.WHITE)
+        visible = set()
+        for k in range(len(fleet)):
+            target_index = int(fleet.target_index[k])
+            points = fleet.routes[k, target_index:fleet.route_len[k]].tolist()
+            working = fleet.working[k]
+            tasks = snapshot.tasks[k]
+            # Segment i de [position] + points : le segment 0 part du taxi et est dessiné à chaque image
+            for i in range(1, len(points)):
+                if working and i == target_index - 1 and i % 2 == 0:
+                    line_color = config.ORANGE  # Segment de la tâche active
+                else:
+                    line_color = config.BLACK  # Autres segments
+                pygame.draw.line(layer, line_color, points[i - 1], points[i], 2)
+
+            # Affichage des waypoints : Départ (vert), Destination (bleu)
+            for i, point in enumerate(points, start=target_index):
+                color = config.GREEN if i % 2 == 0 else config.BLUE
+                pygame.draw.circle(layer, color, (int(point[0]), int(point[1])), 5)
+                if i % 2 == 0 and i // 2 < len(tasks):
+                    task_id, start = tasks[i // 2]
+                    layer.blit(self.task_label(task_id), (start[0] - 10, start[1] - 20))
+                    visible.add(task_id)
+        # Les étiquettes des tâches qui ne sont plus affichées sont oubliées
+        self.task_labels = {task_id: label for task_id, label in self.task_labels.items() if task_id in visible}
+
+    def draw(self, screen, snapshot):
+        """Dessine l'instantané (fleet.FleetSnapshot) et retourne les rectangles de l'écran modifiés."""
+        fleet = snapshot.fleet
+        full = self.routes_changed(fleet)
+        if full:
+            self.draw_layer(snapshot)
+            self.layer_state = fleet
+            screen.blit(self.layer, (0, 0))
+        else:
+            # On efface les éléments mobiles de l'image précédente avec la couche statique
+            for rect in self.dirty:
+                screen.blit(self.layer, rect, rect)
+
+        rects = []
+        for k, taxi_id in enumerate(snapshot.ids):
+            x, y = fleet.positions[k].tolist()
+            target_index = fleet.target_index[k]
+            if target_index < fleet.route_len[k]:
+                # Segment vers le waypoint courant (segment 0 : actif si target_index vaut 1, comme dans draw_layer)
+                line_color = config.ORANGE if fleet.working[k] and target_index == 1 else config.BLACK
+                rects.append(pygame.draw.line(screen, line_color, (x, y), fleet.routes[k, target_index].tolist(), 2))
+            # Dessiner le taxi (cercle rouge) et son identifiant
+            rects.append(pygame.draw.circle(screen, config.RED, (int(x), int(y)), 8))
+            rects.append(screen.blit(self.taxi_label(taxi_id), (x - 10, y - 20)))
+
+        updated = [screen.get_rect()] if full else self.dirty + rects
+        self.dirty = rects
+        return updated
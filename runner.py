@@ -0,0 +1,65 @@
+import threading
+import time
+import config
+
+
+class SimulationRunner(threading.Thread):
+    """
+    Fait avancer la simulation dans son propre thread, par pas fixes de dt secondes (1/FPS par défaut,
+    comme headless.run_headless), indépendamment de l'affichage :
+       - en temps réel (realtime), le temps simulé suit l'horloge, et rattrape son retard sans attendre
+         après un tour d'allocation trop long ;
+       - sinon la simulation avance aussi vite que possible.
+    Les tours d'allocation tournent donc hors du thread d'affichage, qui reste réactif pendant les
+    allocations lentes (DCOP...). Au plus FPS fois par seconde, un instantané de l'état affiché
+    (Simulation.snapshot) est publié dans snapshot : le thread d'affichage dessine toujours le plus
+    récent, les instantanés publiés pendant qu'il dessinait sont sautés.
+    """
+    def __init__(self, sim, realtime=True, dt=None):
+        super().__init__(daemon=True)
+        self.sim = sim
+        self.realtime = realtime
+        self.dt = dt if dt is not None else 1 / config.FPS
+        self.current_time = 0.0 # Temps simulé (en ms)
+        self.steps = 0
+        self.snapshot = sim.snapshot() # Dernier instantané publié
+        self.published = 1              # Nombre d'instantanés publiés
+        self.paused = False
+        self.stopped = False
+        self.origin = time.perf_counter() # Instant correspondant au temps simulé 0, en temps réel
+        self.pause_start = None
+
+    def toggle_pause(self):
+        if self.paused:
+            # Le temps passé en pause ne doit pas être rattrapé
+            self.origin += time.perf_counter() - self.pause_start
+        else:
+            self.pause_start = time.perf_counter()
+        self.paused = not self.paused
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self):
+        sim = self.sim
+        self.origin = time.perf_counter()
+        last_publish = self.origin
+        while not self.stopped and (sim.arrivals or any(taxi.tasks for taxi in sim.taxis)):
+            if self.paused:
+                time.sleep(self.dt)
+                continue
+            if self.realtime:
+                ahead = (self.current_time / 1000 + self.dt) - (time.perf_counter() - self.origin)
+                if ahead > 0:
+                    time.sleep(ahead)
+            self.current_time += self.dt * 1000
+            sim.update(self.current_time, self.dt)
+            self.steps += 1
+
+            now = time.perf_counter()
+            if now - last_publish >= 1 / config.FPS:
+                self.snapshot = sim.snapshot()
+                self.published += 1
+                last_publish = now
+        self.snapshot = sim.snapshot()
+        self.published += 1
@@ -1,72 +1,140 @@
-from matplotlib import pyplot as plt
-import pygame
 import random
 import math
-import itertools
 import sys
-from copy import deepcopy
+import time
+import heapq
+from array import array
+import numpy as np
 from taxi import Taxi
-from task import Task
+from fleet import Fleet, FleetSnapshot
+from distances import DistanceCache
+from sources import TaskStream, random_tasks, file_tasks
+from arrivals import make_arrivals
+from bids import BidEngine, BidCache, regret_queue
+from bidpool import BidPool
+from agents import AgentRuntime
+from assignment import hungarian
+from spatial import SpatialIndex
+from budget import deadline_in, remaining, expired
+from profiling import Profiler, NullProfiler
 import config
-#import dcop
+import dcop
 import subprocess
 import json
 
+def percentiles(values):
+    """Percentiles 50, 95 et 99 d'une série de mesures, None si elle est vide."""
+    if len(values) == 0:
+        return None
+    return np.percentile(np.asarray(values), [50, 95, 99]).tolist()
+
+
 class Simulation:
     """Gère l'environnement, la génération de tâches et l'allocation aux taxis."""
-    def __init__(self, width, height, num_taxis, task_interval, num_tasks_spawn, resolutionType, isPenalty, random_task, algo):
+    def __init__(self, width, height, num_taxis, task_interval, num_tasks_spawn, resolutionType, isPenalty, random_task, algo, seed=None,
+                 task_file="task_created.json", arrival=None, reoptimize=None, profile=None):
         self.width = width  # Largeur de la fenêtre
         self.height = height # Taille de la fenêtre
-        self.taxis = [] # Liste des taxis
+        self.fleet = Fleet(num_taxis) # Etat des taxis (positions, routes...) dans des tableaux contigus
+        self.distances = DistanceCache() # Distances entre tâches, partagées par les taxis et les allocateurs
+        self.taxis = [] # Liste des taxis, des vues sur self.fleet
         self.num_tasks_spawn = num_tasks_spawn # Nombre de tâches générées à chaque intervalle
         self.paused = False 
-        self.resolutionType = resolutionType # Type de résolution (greedy, dcop, PSI, SSI, regret)
+        self.resolutionType = resolutionType # Type de résolution (greedy, dcop, PSI, SSI, regret, optimal, agents)
+        # Instrumentation (profiling.Profiler si profile, config.PROFILE par défaut) : intervalles et compteurs par tour,
+        # propres à cette simulation (transmis aux taxis et aux moteurs d'offres)
+        if config.PROFILE if profile is None else profile:
+            self.profiler = Profiler(config.PROFILE_CPROFILE)
+        else:
+            self.profiler = NullProfiler()
         for i in range(num_taxis): # Création des taxis au centre de l'environnement
             pos = (config.WIDTH/2 + i, config.HEIGHT/2 + i)
-            self.taxis.append(Taxi(i, pos))
+            self.taxis.append(Taxi(i, pos, self.fleet, self.distances, self.profiler))
         self.task_interval = task_interval # Intervalle de génération de tâches (en ms)
         self.last_task_time = -10000  # Temps (en ms) de la dernière génération de tâche
-        self.task_counter = 0    # Compteur pour assigner des ID uniques aux tâches, pour la génération aléatoire
         self.isPenalty = isPenalty # Indique si on utilise une pénalité en fonction de la taille des tâches à effectuer, pour insertion_heuristic
         self.random_task = random_task # Générer des tâches aléatoires ou prédéfinies, True pour aléatoire, False pour prédéfini
-        self.algo = algo # Algorithme de résolution (dpop, dsa, etc.)
-        self.task_list = [] # Liste des tâches prédéfinies
-        with open("task_created.json", "r") as f: # Charger les tâches prédéfinies
-            task_json = json.load(f)
-        for task in task_json:
-            start = task["start"]
-            destination = task["end"]
-            id = task["task_id"]
-            task = Task(start, destination, id)
-            self.task_list.append(task)
+        self.algo = algo # Algorithme de résolution DCOP intégré (dpop, dsa, mgm) ou via pydcop (pydcop-dpop, pydcop-dsa, pydcop-mgm), ou protocole des agents (ssi, psi)
+        self.rng = random.Random(seed) # Générateur aléatoire propre à la simulation, pour des expériences reproductibles
+        self.np_rng = np.random.default_rng(seed) # Générateur pour les solveurs DCOP stochastiques (DSA)
+        # Source des tâches, lue par lots au fur et à mesure : aléatoire, ou tâches prédéfinies de task_file
+        # (.json, .jsonl, .csv ou trace binaire .bin, voir sources.py)
+        if random_task:
+            self.task_source = TaskStream(random_tasks(self.rng, self.width, self.height))
+        else:
+            self.task_source = TaskStream(file_tasks(task_file))
+        # Processus d'arrivée (batch, poisson, bursty ou trace, config.ARRIVAL_MODE par défaut), avec son propre générateur
+        self.arrival_rng = random.Random(None if seed is None else f"arrivals-{seed}")
+        self.arrivals = make_arrivals(arrival or config.ARRIVAL_MODE, self.task_source, num_tasks_spawn, self.arrival_rng)
+        self.spatial_index = SpatialIndex(config.SPATIAL_CELL_SIZE, config.SPATIAL_MAX_LEG, self.taxis) # Index des taxis pour les grandes flottes
+        self.bid_pool = BidPool(config.BID_PROCESSES) if config.PARALLEL_BIDDING else None # Calcul parallèle des offres pour les très grandes flottes
+        self.renderer = None # Affichage pygame (renderer.Renderer), créé au premier dessin
+        self.agent_runtime = None # Agents des enchères décentralisées (resolutionType "agents"), démarrés à la première allocation
         self.mean_route_cost = [] # Coût moyen des itinéraires des taxis pour évaluation
-
-
-    def generate_task(self):
-        """Génère une nouvelle tâche avec un départ et une destination aléatoires dans l'environnement."""
-        tasks = []
-        for _ in range(self.num_tasks_spawn):
-            start = (random.randint(0, self.width), random.randint(0, self.height))
-            destination = (random.randint(0, self.width), random.randint(0, self.height))
-            task = Task(start, destination, self.task_counter)
-            self.task_counter += 1
-            tasks.append(task)
-        return tasks
-    
-    def created_tasks(self, num_tasks):
-        """Génère des tâches prédéfinies pour tester les algorithmes sur les mêmes instances."""
-
-        if self.task_list == []:
+        self.allocation_times = [] # Temps de calcul (en secondes) de chaque tour d'allocation
+        self.waiting_times = array("d") # Attente (en secondes simulées) de chaque tâche terminée, de sa création à sa prise en charge
+        self.latencies = array("d")     # Durée (en secondes simulées) de chaque tâche terminée, de sa création à sa dépose
+        # Réoptimisation à horizon glissant (config.REOPTIMIZATION par défaut)
+        self.reoptimize = config.REOPTIMIZATION if reoptimize is None else reoptimize
+        self.last_reoptimization = 0.0 # Temps (en ms) de la dernière passe
+        # Nombre de tâches réallouées par passe : chacune est mise aux enchères auprès de tous les taxis
+        self.reoptimization_batch = min(config.REOPTIMIZATION_MAX_TASKS, max(1, config.REOPTIMIZATION_EVALUATIONS // max(1, num_taxis)))
+        self.reoptimization_times = [] # Temps de calcul (en secondes) de chaque passe
+        self.reoptimizations = 0       # Nombre de passes dont la réallocation a été gardée
+
+    def completed_tasks(self):
+        """Nombre de tâches terminées par l'ensemble des taxis."""
+        return sum(taxi.completed_tasks for taxi in self.taxis)
+
+    def record_completion(self, task):
+        """Enregistre l'attente et la durée totale d'une tâche terminée."""
+        if task.created is None or task.dropped_off is None:
+            return
+        self.latencies.append((task.dropped_off - task.created) / 1000)
+        if task.picked_up is not None:
+            self.waiting_times.append((task.picked_up - task.created) / 1000)
+
+    def summary(self):
+        """Métriques communes aux différents modes d'exécution (main, headless, événements, benchmark)."""
+        mean_cost = sum(self.mean_route_cost) / len(self.mean_route_cost) if self.mean_route_cost else 0
+        rounds = len(self.allocation_times)
+        result = {
+            "resolutionType": self.resolutionType,
+            "algoDcop": self.algo,
+            "nombre de tache": self.num_tasks_spawn,
+            "nombre de taxis": len(self.taxis),
+            "taches terminees": self.completed_tasks(),
+            "moyenne du cout de route": mean_cost,
+            "tours d'allocation": rounds,
+            "temps moyen par tour": sum(self.allocation_times) / rounds if rounds else 0,
+            "temps max par tour": max(self.allocation_times, default=0),
+            "attente (p50, p95, p99)": percentiles(self.waiting_times),
+            "latence (p50, p95, p99)": percentiles(self.latencies),
+            "temps de decision (p50, p95, p99)": percentiles(self.allocation_times),
+            "reoptimisations (gardees, passes)": [self.reoptimizations, len(self.reoptimization_times)],
+        }
+        if self.agent_runtime is not None:
+            messages = self.agent_runtime.messages
+            result["messages (etats, annonces, offres, attributions, en retard)"] = [
+                messages["state"], messages["announce"], messages["bid"], messages["award"], messages["late"]]
+            result["duree des tours d'encheres (p50, p95, p99)"] = percentiles(self.agent_runtime.round_latencies)
+        if self.profiler.active:
+            result["temps par phase"] = self.profiler.totals()
+        return result
+
+
+    def generate_task(self, current_time=0.0):
+        """
+        Nouvelles tâches arrivées jusqu'à current_time (en ms), selon le processus d'arrivée
+        (aléatoires si random_task, sinon prédéfinies pour tester les algorithmes sur les mêmes instances).
+        """
+        if not self.arrivals:
             print("Plus de tâches à générer !")
-
-        created_tasks_list = self.task_list[:num_tasks]
-        self.task_list = self.task_list[num_tasks:]    
-        
-        return created_tasks_list
+        return self.arrivals.release(current_time)
 
 
 
-    def greedy_task_assignment(self, taxis, tasks):
+    def greedy_task_assignment(self, taxis, tasks, deadline=None):
         """
         Affecte chacune des tâches de la liste tasks au taxi le plus proche
         (en tenant compte du temps qu'il met à finir ses tâches déjà assignées).
@@ -76,186 +144,150 @@ class Simulation:
             distance(position du taxi, tâche.start) + distance(tâche.start, tâche.destination)
         - Sinon, le coût est égal à la somme des distances le long de la file d'attente 
             distance(position actuelle, tâche.start) + distance(tâche.start, tâche.destination).
-        - On test toutes les permutations possibles de la liste des nouvelles tâches et on retient la meilleure.
+        - On test toutes les permutations possibles de la liste des nouvelles tâches et on retient
+            celle qui minimise la route la plus longue (makespan).
+
+        L'état de la flotte est résumé, pour chaque taxi, par la fin de sa file (tail, sous forme de ses
+        distances aux nouvelles tâches) et le coût cumulé de sa file : ajouter une tâche se fait en O(1),
+        sans copier les taxis ni calculer de distance.
+        Les permutations sont parcourues en profondeur et une branche est abandonnée dès que
+        son makespan partiel atteint celui de la meilleure permutation trouvée.
+        Passé deadline, l'exploration s'arrête et la meilleure permutation trouvée est retenue
+        (la première descente donne toujours une permutation complète).
         """
-        
+        if not tasks or not taxis:
+            return
+
+        # Etat initial de la flotte : coût FIFO de chaque taxi et distances de la fin de sa file
+        # (position ou dernière destination) au départ de chaque nouvelle tâche
+        costs = [taxi.current_route_cost for taxi in taxis]
+        tails = [[self.distances.hop(taxi.tasks[-1], task) for task in tasks] if taxi.tasks
+                 else [math.dist(taxi.position, task.start) for task in tasks] for taxi in taxis]
+        hops = self.distances.hop_table(tasks) # Nouvelle fin de file d'un taxi après la tâche i : hops[i]
+
+        task_lengths = [task.length for task in tasks]
+        # Les tâches les plus longues sont essayées en premier : la première permutation explorée
+        # est alors une bonne solution initiale, ce qui renforce l'élagage.
+        exploration_order = sorted(range(len(tasks)), key=lambda i: -task_lengths[i])
+        best = {"makespan": float('inf'), "assignment": None}
+        assignment = [] # Liste de la forme [(indice de la tâche, indice du taxi)...]
+        used = [False] * len(tasks)
+
+        visited = set() # Etats (tâches utilisées, coûts des files) déjà explorés
+
+        def explore(makespan, remaining_length):
+            if self.profiler.active:
+                self.profiler.count("permutations explorees")
+            if best["assignment"] is not None and expired(deadline): # Budget épuisé : on garde la meilleure permutation
+                return
+            # Borne inférieure : le makespan ne peut que croître, et le travail restant
+            # se répartit au mieux équitablement entre les taxis.
+            bound = max(makespan, (sum(costs) + remaining_length) / len(costs))
+            if bound >= best["makespan"]: # Elagage : la branche ne peut plus faire mieux
+                return
+            if len(assignment) == len(tasks):
+                best["makespan"] = makespan
+                best["assignment"] = list(assignment)
+                return
+            # Chaque tâche restante coûtera au moins sa longueur en plus de la plus petite file
+            shortest_queue = min(costs)
+            if any(not used[i] and shortest_queue + task_lengths[i] >= best["makespan"] for i in range(len(tasks))):
+                return
+            # Deux ordres différents peuvent mener au même état (tâches affectées à des taxis différents) :
+            # on n'explore chaque état qu'une fois.
+            state = (tuple(used), tuple(costs))
+            if state in visited:
+                return
+            visited.add(state)
+            for i in exploration_order:
+                if used[i]:
+                    continue
+                # On choisit le taxi avec le moindre coût estimé pour cette tâche
+                best_taxi = 0
+                best_estimated_cost = float('inf')
+                for k in range(len(taxis)):
+                    cost = costs[k] + tails[k][i] + task_lengths[i]
+                    if cost < best_estimated_cost:
+                        best_estimated_cost = cost
+                        best_taxi = k
 
-        all_permutation = [list(task) for task in itertools.permutations(tasks)]
-        taxi_tmp = deepcopy(taxis)
+                # Ajout de la tâche au taxi puis retour arrière après exploration
+                previous_tail, previous_cost = tails[best_taxi], costs[best_taxi]
+                tails[best_taxi], costs[best_taxi] = hops[i], best_estimated_cost
+                used[i] = True
+                assignment.append((i, best_taxi))
 
-        best_Permutation = None
-        for permutation in all_permutation: # On cherche la meilleure permutation
-            best_allocation_cost = float('inf')
-            list_estimated_cost = []
-            longest_route = 0
-            taxi_tmp = deepcopy(taxis) # On remet taxi_tmp à sa valeur initiale à chaque nouvelle permutation
+                explore(max(makespan, best_estimated_cost), remaining_length - task_lengths[i])
 
-            # Pour chaque tâche à affecter, on choisit le taxi avec le moindre coût estimé.
-            for task in permutation:
-                best_taxi = None
-                best_estimated_cost = float('inf')
+                assignment.pop()
+                used[i] = False
+                tails[best_taxi], costs[best_taxi] = previous_tail, previous_cost
 
-                for taxi in taxi_tmp:
-                    # Calcul du coût de réalisation si l'on affecte cette tâche au taxi,
-                    cost = 0.0
-                    current_pos = taxi.position
-                    
-                    # Calcul du coût de réalisation des tâches deja presentes dans la file
-                    for t in taxi.tasks:
-                        cost += math.dist(current_pos, t.start) + math.dist(t.start, t.destination)
-                        current_pos = t.destination
-                    
-                    cost += math.dist(current_pos, task.start) + math.dist(task.start, task.destination)
-                                        
-                    if cost < best_estimated_cost:
-                        best_estimated_cost = cost
-                        best_taxi = taxi
-
-                best_taxi.tasks.append(task)
-
-            for taxi in taxi_tmp: # On calcule le coût de la permutation
-
-                taxi.calculate_total_route_cost()
-                list_estimated_cost.append(taxi.current_route_cost)
-
-            longest_route = max(list_estimated_cost) # On récupère le coût le plus long entre les taxis, pour avoir le coût de la permutation
-
-            if longest_route < best_allocation_cost: # On compare le coût de la permutation avec le meilleur coût trouvé
-                best_allocation_cost = longest_route
-                best_Permutation = permutation
-
-        for task in best_Permutation: # On parcourt la meilleure permutation pour affecter les tâches aux taxis
-            best_taxi = None
-            best_estimated_cost = float('inf')
-
-            for taxi in taxis:
-  
-                cost = 0.0
-                current_pos = taxi.position
-                
-                
-                for t in taxi.tasks:
-                    cost += math.dist(current_pos, t.start) + math.dist(t.start, t.destination)
-                    current_pos = t.destination
-                
-                # Coût pour la nouvelle tâche
-                cost += math.dist(current_pos, task.start) + math.dist(task.start, task.destination)
-                
-                if cost < best_estimated_cost:
-                    best_estimated_cost = cost
-                    best_taxi = taxi
-            
-        
-            best_taxi.tasks.append(task)
+        explore(max(costs), sum(task_lengths))
+
+        for i, k in best["assignment"]: # On affecte les tâches selon la meilleure permutation
+            task = tasks[i]
+            best_taxi = taxis[k]
+            best_taxi.append_task(task)
             
             # Mise à jour de l'itinéraire du taxi :
             # Si le taxi n'avait pas d'itinéraire (pas de tâches en attente), on le crée.
             # Sinon, on ajoute simplement les deux points (start et destination) à la suite.
-            if not best_taxi.route:
-                best_taxi.route = [task.start, task.destination]
-                best_taxi.target_index = 0
-            else:
-                best_taxi.route.extend([task.start, task.destination])
-            
-            # mise à jour du coût total estimé de la file
-            current_pos = best_taxi.position
-            route_cost = 0.0
-            for t in best_taxi.tasks:
-                route_cost += math.dist(current_pos, t.start) + math.dist(t.start, t.destination)
-                current_pos = t.destination
-            best_taxi.current_route_cost = route_cost
+            best_taxi.extend_route(task)
 
 
     def cost_dcop(self, taxi, task):
         cost=100000000000
         if taxi.isWorking:
-            cost = math.dist(task.start, task.destination)+math.dist(taxi.tasks[taxi.target_index//2].destination,task.start)
+            cost = task.length+self.distances.hop(taxi.tasks[taxi.target_index//2],task)
             return cost
         
         else:
-            cost= math.dist(task.start, task.destination)+math.dist(taxi.position,task.start)
+            cost= task.length+math.dist(taxi.position,task.start)
             for ta in taxi.tasks:
-                cost = min(cost,(math.dist(task.start, task.destination)+math.dist(ta.destination,task.start)))
+                cost = min(cost,(task.length+self.distances.hop(ta,task)))
             return cost
 
 
 
-    def generate_dcop(self, taxis,tasks, nom):
+    def build_dcop_model(self, taxis, tasks):
+        """
+        Construit le DCOP en mémoire : une variable par tâche, de domaine les taxis, avec le coût
+        cost_dcop de chaque couple (taxi, tâche) et le coût d'enchaînement de deux tâches
+        affectées au même taxi.
+        """
+        num_tasks, num_taxis = len(tasks), len(taxis)
+        unary = np.array([[self.cost_dcop(taxi, task) for taxi in taxis] for task in tasks]).reshape(num_tasks, num_taxis)
+        pairwise = np.zeros((num_tasks, num_tasks, num_taxis, num_taxis))
+        same_taxi = np.eye(num_taxis)
+        for i in range(num_tasks):
+            for j in range(i + 1, num_tasks):
+                cout = self.distances.hop(tasks[i], tasks[j])
+                pairwise[i, j] = cout * same_taxi
+                pairwise[j, i] = pairwise[i, j].T
+        variables = [f"Tache_{task.id}" for task in tasks]
+        values = [f"T{taxi.id}" for taxi in taxis]
+        return dcop.DcopModel(variables, values, unary, pairwise)
 
-        with open(nom,"w") as f:
-            f.write("name: Allocation en ligne de taches \n")
-            f.write("objective: min \n")
-            f.write("\n")
-
-            #Ecriture des domaines dans le fichier yaml
-            f.write("domains: \n")
-            f.write("   taxis: \n" )
-            f.write("      values: ")
-            f.write("[")
-            for i in range(len(taxis)):
-                f.write("T"+str(taxis[i].id))
-                if i<len(taxis)-1:
-                    f.write(",")
-            f.write("]\n")
-            f.write("\n")
-
-            #Ecriture des variables dans le fichier yaml
-            f.write("variables: \n")
-            for tache in tasks:
-                f.write("   ")
-                f.write("Tache_"+str(tache.id))
-                f.write(" : \n")
-                f.write("      domain: taxis \n")
-            f.write("\n")
-
-
-            f.write("constraints: \n")
-            for i in range(len(tasks)):
-                f.write(f"   pref_{i+1}: \n")
-                f.write("      type: extensional \n")
-                f.write(f"      variables: Tache_{tasks[i].id} \n")
-
-                f.write("      values: \n")
-                for j in range(len(taxis)):
-                    f.write(f"         {j+1}: T{taxis[j].id} \n")
-
-                f.write("\n")
-            
-            for i in range(len(tasks)):
-                for j in range(len(tasks)):
-                    if i<j:
-                        f.write(f"   different_Tache_{tasks[i].id}_Tache_{tasks[j].id}: \n")
-                        f.write("      type: intention \n")
-                        cout=math.dist(tasks[i].destination,tasks[j].start)
-                        f.write(f"      function: {cout} if Tache_{tasks[i].id} == Tache_{tasks[j].id} else 0 \n")
-                        f.write("\n")
-            
-            for i in range(len(taxis)):
-                f.write(f"   cout_T{taxis[i].id}: \n")
-                f.write("      type: intention \n")
-                f.write(f"      function: {self.cost_dcop(taxis[i],tasks[0])} if Tache_{tasks[0].id} =='T{taxis[i].id}'")
-                for j in range(1,len(tasks)-1):
-                    f.write(f" else {self.cost_dcop(taxis[i],tasks[j])} if Tache_{tasks[j].id} =='T{taxis[i].id}'")
-                if len(tasks)>1:
-                    f.write(f" else {self.cost_dcop(taxis[i],tasks[-1])}")
-                f.write("\n")
-            
-            f.write("\n")
-            f.write(f"agents: \n")
-            for i in range(len(tasks)):
-                f.write(f"   Tache_{tasks[i].id}: \n")
-                f.write("      capacity: 1 \n")
+    def generate_dcop(self, taxis,tasks, nom):
+        """Ecrit le DCOP au format yaml de pydcop, avec des contraintes extensionnelles issues des tables de coûts."""
+        self.build_dcop_model(taxis, tasks).to_yaml(nom)
 
-    def solve_dcop(self, yaml_file):
+    def solve_dcop(self, yaml_file, deadline=None):
         output_file = "results.json"
-        
-        # Exécuter la commande PyDCOP
-        if self.algo == "dpop":
+        # Le délai de pydcop est le temps restant avant deadline (1 s s'il n'y en a pas)
+        timeout = "1" if deadline is None else f"{max(remaining(deadline), 0.01):.3f}"
+
+        # Exécuter la commande PyDCOP (algo de la forme "pydcop-dpop", "pydcop-dsa" ou "pydcop-mgm")
+        algo = self.algo.removeprefix("pydcop-")
+        if algo == "dpop":
             command = ["pydcop", "--output", output_file, "solve", "--algo", "dpop", yaml_file]
-        if self.algo == "dsa":
-            command = ["pydcop", "--output", output_file,"--timeout","1", "solve", "--algo", "dsa", yaml_file]
-        if self.algo == "mgm":
-            command = ["pydcop", "--output", output_file,"--timeout", "1", "solve", "--algo", "mgm",  yaml_file]
+            if deadline is not None:
+                command[3:3] = ["--timeout", timeout]
+        if algo == "dsa":
+            command = ["pydcop", "--output", output_file,"--timeout",timeout, "solve", "--algo", "dsa", yaml_file]
+        if algo == "mgm":
+            command = ["pydcop", "--output", output_file,"--timeout", timeout, "solve", "--algo", "mgm",  yaml_file]
 
         result = subprocess.run(command, capture_output=True, text=True)
         
@@ -283,160 +315,223 @@ class Simulation:
             taxi = next((t for t in taxis if t.id == int(taxi_id.split('T')[1])), None)
 
             if task and taxi:
-                taxi.tasks.append(task)
+                taxi.append_task(task)
             
                 # Mise à jour de l'itinéraire du taxi en mode FIFO :
                 # Si le taxi n'avait pas d'itinéraire (pas de tâches en attente), on le crée.
                 # Sinon, on ajoute simplement les deux points (start et destination) à la suite.
-                if not taxi.route:
-                    taxi.route = [task.start, task.destination]
-                    taxi.target_index = 0
-                else:
-                    taxi.route.extend([task.start, task.destination])
-                
-                # On peut aussi mettre à jour le coût total estimé de la file (pour information)
-                current_pos = taxi.position
-                route_cost = 0.0
-                for t in taxi.tasks:
-                    route_cost += math.dist(current_pos, t.start) + math.dist(t.start, t.destination)
-                    current_pos = t.destination
-                taxi.current_route_cost = route_cost
+                taxi.extend_route(task)
 
 
     def insertion_heuristic(self, taxi, task):
-        """simule l'insertion d'une tâche dans la liste des tâches d'un taxi"""
-
-        taxi.calculate_total_route_cost()
-        current_route_cost = taxi.current_route_cost
-
-        if not taxi.tasks:
-            return math.dist(taxi.position, task.start) + math.dist(task.start, task.destination), 0
-        
-
-        best_cost_with_insertion = float('inf')
-        best_index = 0
-        penalty = 0
-
-
-        for pos in range(len(taxi.tasks) + 1): # On teste toutes les positions possibles pour l'insertion
-            candidate_tasks = deepcopy(taxi.tasks)
-            candidate_tasks.insert(pos, task)
-            cost = 0
-            pos_point = taxi.position
-            for t in candidate_tasks:
-                cost += math.dist(pos_point, t.start) + math.dist(t.start, t.destination)
-                pos_point = t.destination
-            if cost < best_cost_with_insertion:
-                best_cost_with_insertion = cost
-                best_index = pos
-
-        gap_cost = best_cost_with_insertion - current_route_cost
-
-        if self.isPenalty:
-            penalty = len(taxi.tasks) * 50 # Coût de pénalité en fonction de la taille de la file d'attente
-            gap_cost += penalty
-        
-        return gap_cost, best_index
+        """
+        simule l'insertion d'une tâche dans la liste des tâches d'un taxi
+        Contrairement à la version d'origine, elle ne recalcule plus le coût du taxi (calculate_total_route_cost) :
+        le calcul d'une offre n'a pas d'effet de bord (voir le coût moyen des itinéraires dans spawn_tasks).
+        """
 
-    def PSI_task_assignment(self, taxis, tasks):
-        """Attribution parallèle des tâches via PSI (enchères parallèles)."""
-        bids = {} # Dictionnaire de la forme {task: [(taxi_id, bid, insertion_index)]}
-        bid = 0
-        insertion_index = 0
+        bids, index = BidEngine([taxi], self.isPenalty, self.profiler).bids([task])
+        return float(bids[0, 0]), int(index[0, 0])
 
-        for task in tasks:
-            bids[task] = []
+    def award(self, taxi, task, index):
+        """Insère la tâche gagnée par le taxi à la position de son offre."""
+        taxi.insert_task(index, task)
+        taxi.allow_reordering = False
+        if not taxi.isWorking:
+            taxi.build_route_from_current_tasks()
 
-            for taxi in taxis:
-                bid, insertion_index = self.insertion_heuristic(taxi, task)
-                bids[task].append((taxi.id, bid, insertion_index))
+    def use_spatial_index(self, taxis):
+        """
+        L'index spatial ne sert que pour les grandes flottes, et seulement s'il indexe ces taxis.
+        Il est alors mis à jour, puis utilisé si la majorité des taxis n'ont que des segments courts
+        (sinon presque toutes les offres seraient calculées de toute façon).
+        """
+        if taxis is not self.taxis or len(taxis) < config.SPATIAL_INDEX_MIN_TAXIS:
+            return False
+        self.spatial_index.sync(taxis)
+        return len(self.spatial_index.long_taxis) <= len(taxis) // 2
+
+    def use_bid_pool(self, taxis):
+        """Le calcul parallèle des offres ne sert que s'il est activé, et pour les très grandes flottes."""
+        return (self.bid_pool is not None and self.bid_pool.available
+                and len(taxis) >= config.PARALLEL_BIDDING_MIN_TAXIS)
+
+    def all_bids(self, engine, tasks):
+        """Offres (taxis, tâches) de tous les taxis pour toutes les tâches, calculées en parallèle si possible."""
+        if tasks and self.use_bid_pool(engine.taxis):
+            return self.bid_pool.bids(engine, tasks)
+        return engine.bids(tasks)
+
+    def PSI_task_assignment(self, taxis, tasks, deadline=None):
+        """
+        Attribution parallèle des tâches via PSI (enchères parallèles).
+        Toutes les tâches étant attribuées en un seul tour, deadline n'est pas utilisée.
+        """
+        if not tasks or not taxis:
+            return
+
+        engine = BidEngine(taxis, self.isPenalty, self.profiler)
+        if self.use_spatial_index(taxis):
+            # Seules les offres des taxis proches de chaque tâche sont calculées
+            winners = [self.spatial_index.best_bids(engine, task)[0][1:] for task in tasks]
+        elif self.use_bid_pool(taxis):
+            # Chaque processus ne renvoie que la meilleure offre de sa tranche de taxis pour chaque tâche
+            _, best, index = self.bid_pool.best_bids(engine, tasks)
+            winners = [(int(k), int(i)) for k, i in zip(best[0], index[0])]
+        else:
+            # Toutes les offres (taxis x tâches) sont calculées en une seule passe
+            bids, index = engine.bids(tasks)
+            best = np.argmin(bids, axis=0) # Meilleure offre pour chaque tâche
+            winners = [(k, int(index[k, j])) for j, k in enumerate(best)]
 
-        for task, task_bids in bids.items():
-            if not task_bids: # Si aucune offre n'a été faite pour cette tâche
-                continue
+        for task, (k, index) in zip(tasks, winners):
+            self.award(taxis[k], task, index)
 
-            best_bid = min(task_bids, key=lambda x: x[1]) # Meilleure offre pour la tâche
-            best_taxi_id, best_bid, best_index = best_bid
 
-            best_taxi = next(t for t in taxis if t.id == best_taxi_id) # Trouver le taxi correspondant
+    def spatial_sequential_auction(self, taxis, tasks, order, engine, deadline=None):
+        """
+        Enchères séquentielles sur les tâches dans l'ordre donné, en n'interrogeant que les taxis proches.
+        Passé deadline, les offres ne sont plus mises à jour après chaque attribution : les tâches
+        restantes sont attribuées en un seul tour, comme avec PSI.
+        """
+        for j in order:
+            _, k, index = self.spatial_index.best_bids(engine, tasks[j])[0]
+            self.award(taxis[k], tasks[j], index)
+            if not expired(deadline):
+                engine.refresh_taxi(k)
+                self.spatial_index.sync_taxi(k, taxis[k])
+
+    def sequential_auction(self, taxis, tasks, order, cache, deadline=None):
+        """
+        Enchères séquentielles sur les tâches dans l'ordre donné : les offres sont calculées une fois
+        (cache, un BidCache), puis seule la ligne du taxi gagnant est recalculée.
+        Passé deadline, les tâches restantes sont attribuées en un seul tour avec les offres courantes, comme avec PSI.
+        """
+        for position, j in enumerate(order):
+            if expired(deadline):
+                for j in order[position:]:
+                    k, index = cache.best_bid(j)
+                    self.award(taxis[k], tasks[j], index)
+                return
+            k, index = cache.best_bid(j)
+            self.award(taxis[k], tasks[j], index)
+            cache.invalidate(k, j)
+
+    def SSI_task_assignment(self, taxis, tasks, deadline=None):
+        """Enchères sequentielles, où les offres sont réalisées itérativement sur les items"""
+        if not taxis:
+            return
 
-            best_taxi.tasks.insert(best_index, task)
-            best_taxi.allow_reordering = False
-            if not best_taxi.isWorking:
-                best_taxi.build_route_from_current_tasks()
+        if self.use_spatial_index(taxis):
+            self.spatial_sequential_auction(taxis, tasks, range(len(tasks)), BidEngine(taxis, self.isPenalty, self.profiler), deadline)
+            return
 
+        engine = BidEngine(taxis, self.isPenalty, self.profiler)
+        cache = BidCache(engine, tasks, self.all_bids(engine, tasks))
+        self.sequential_auction(taxis, tasks, range(len(tasks)), cache, deadline)
 
-    def SSI_task_assignment(self, taxis, tasks):
-        """Enchères sequentielles, où les offres sont réalisées itérativement sur les items"""
-        bid = 0
-        index = 0
-
-        for task in tasks:
-            best_taxi = None
-            best_bid = float('inf')
-            for taxi in taxis:
-                bid, index = self.insertion_heuristic(taxi, task)
-                if bid < best_bid:
-                    best_bid = bid
-                    best_taxi = taxi 
-                    best_index = index         
-            
-            if best_taxi:
-                best_taxi.tasks.insert(best_index, task)
-                best_taxi.allow_reordering = False
-                if not best_taxi.isWorking:
-                    best_taxi.build_route_from_current_tasks()
 
+    def regret_queue(self, taxis, tasks, engine):
+        """File de priorité des tâches par regret décroissant, calculée avec les deux meilleures offres des taxis proches."""
+        queue = []
+        for j, task in enumerate(tasks):
+            best = self.spatial_index.best_bids(engine, task, count=2)
+            regret = best[1][0] - best[0][0] if len(best) > 1 else float('inf')
+            queue.append((-regret, j))
+        heapq.heapify(queue)
+        return queue
 
     def calculate_regret(self, taxis, tasks):
         """Calcul du regret pour chaque tâche"""
 
-        task_regrets = [] # Liste de la forme [(task1, regret1)...]
-        for task in tasks:
-            bids = [] # Liste de la forme [(bid1, taxi_id1)...]
-            for taxi in taxis:
-                bid, _ = self.insertion_heuristic(taxi, task)
-                bids.append((bid, taxi.id))
-                
-            bids.sort(key=lambda x: x[0]) # Tri par coût croissant
-
-            if len(bids) > 1:
-                best_bid, second_best_bid = bids[0][0], bids[1][0]
-                regret = second_best_bid - best_bid
-            else:
-                regret = float('inf')
-
-            task_regrets.append((task, regret))
-
-        task_regrets.sort(key=lambda x: -x[1]) # Tri par regret décroissant
+        if self.use_spatial_index(taxis):
+            queue = self.regret_queue(taxis, tasks, BidEngine(taxis, self.isPenalty, self.profiler))
+        elif self.use_bid_pool(taxis) and len(taxis) > 1:
+            # Les deux meilleures offres de chaque tâche suffisent au regret
+            best, _, _ = self.bid_pool.best_bids(BidEngine(taxis, self.isPenalty, self.profiler), tasks, count=2)
+            queue = regret_queue(best[1] - best[0])
+        else:
+            queue = BidCache(BidEngine(taxis, self.isPenalty, self.profiler), tasks).regret_queue()
+        ordered = []
+        while queue:
+            _, j = heapq.heappop(queue)
+            ordered.append(tasks[j])
 
-        return [tr[0] for tr in task_regrets] # On retourne les tâches dans l'ordre décroissant des regrets
+        return ordered # On retourne les tâches dans l'ordre décroissant des regrets
 
-    def regret_task_assignment(self, taxis, tasks):
+    def regret_task_assignment(self, taxis, tasks, deadline=None):
         """Attribution des tâches en fonction du regret, pour SSI basé sur le regret"""
+        if not taxis:
+            return
+
+        if self.use_spatial_index(taxis):
+            engine = BidEngine(taxis, self.isPenalty, self.profiler)
+            queue = self.regret_queue(taxis, tasks, engine)
+            order = [heapq.heappop(queue)[1] for _ in range(len(queue))]
+            self.spatial_sequential_auction(taxis, tasks, order, engine, deadline)
+            return
 
-        ordered_tasks = self.calculate_regret(taxis, tasks) # Tâches triées par regret décroissant
+        engine = BidEngine(taxis, self.isPenalty, self.profiler)
+        cache = BidCache(engine, tasks, self.all_bids(engine, tasks))
+        queue = cache.regret_queue() # Tâches triées par regret décroissant
 
         #Puis on fait pareil que SSI mais sur les tâches triées avec le regret
-        for task in ordered_tasks:
-            best_taxi = None
-            best_bid = float('inf')
-            best_index = 0
-
-            for taxi in taxis:
-                bid, index = self.insertion_heuristic(taxi, task)
-                if bid < best_bid:
-                    best_bid = bid
-                    best_taxi = taxi
-                    best_index = index
-            
-            if best_taxi:
-                best_taxi.tasks.insert(best_index, task)
-                best_taxi.allow_reordering = False
-                if not best_taxi.isWorking:
-                    best_taxi.build_route_from_current_tasks()
+        order = [heapq.heappop(queue)[1] for _ in range(len(queue))]
+        self.sequential_auction(taxis, tasks, order, cache, deadline)
+
+    def agent_task_assignment(self, taxis, tasks, deadline=None):
+        """
+        Enchères décentralisées (agents.AgentRuntime) : chaque taxi est un agent qui calcule ses propres offres,
+        en enchères séquentielles (algo "ssi", par défaut) ou parallèles (algo "psi").
+        Les tâches restées sans offre (agents trop lents) ou pas encore annoncées à deadline sont
+        attribuées en un seul tour centralisé, comme avec PSI.
+        """
+        if not tasks or not taxis:
+            return
+        if self.agent_runtime is None:
+            self.agent_runtime = AgentRuntime(len(taxis), self.isPenalty)
+        protocol = "psi" if self.algo == "psi" else "ssi"
+        awarded, left = self.agent_runtime.allocate(taxis, tasks, protocol, deadline)
+        for task, k, index in awarded:
+            self.award(taxis[k], task, index)
+        if left:
+            self.PSI_task_assignment(taxis, left)
+
+    def optimal_task_assignment(self, taxis, tasks, deadline=None):
+        """
+        Attribution par affectation de coût minimal (algorithme hongrois, O(n^3)).
+        Chaque taxi est dupliqué en autant de places (slots) que de nouvelles tâches : la place s
+        d'un taxi coûte l'offre d'insertion de la tâche (comme insertion_heuristic) plus
+        s * config.SLOT_PENALTY, pour que les places d'un même taxi se remplissent dans l'ordre et
+        que les tâches se répartissent entre les taxis.
+        Les tâches retenues par un taxi sont ensuite insérées dans l'ordre de leurs places,
+        chacune à sa meilleure position dans la file mise à jour.
+        Passé deadline, les tâches pas encore traitées par l'algorithme hongrois prennent
+        la moins chère des places restantes.
+        """
+        if not tasks or not taxis:
+            return
+
+        bids, _ = self.all_bids(BidEngine(taxis, self.isPenalty, self.profiler), tasks) # (taxis, tâches)
+        num_slots = len(tasks)
+        slot_cost = np.arange(num_slots) * config.SLOT_PENALTY
+        # Colonne k * num_slots + s : place s du taxi k
+        cost = (bids.T[:, :, None] + slot_cost[None, None, :]).reshape(len(tasks), len(taxis) * num_slots)
+        columns = hungarian(cost, deadline)
+
+        for column in sorted(range(len(tasks)), key=lambda j: columns[j]):
+            k = columns[column] // num_slots
+            _, index = self.insertion_heuristic(taxis[k], tasks[column])
+            self.award(taxis[k], tasks[column], index)
+
+    def close(self):
+        """Libère les ressources de la simulation (processus du calcul parallèle des offres)."""
+        if self.bid_pool is not None:
+            self.bid_pool.close()
+        if self.agent_runtime is not None:
+            self.agent_runtime.close()
+        self.profiler.close(config.PROFILE_OUTPUT)
 
-                    
     def __repr__(self):
         return f"Simulation(width={self.width}, height={self.height}, num_taxis={len(self.taxis)}, task_interval={self.task_interval}, num_tasks_spawn={self.num_tasks_spawn})"
 
@@ -446,90 +541,194 @@ class Simulation:
     def update(self, current_time, dt):
         """
         Met à jour la simulation :
-         - Génère une nouvelle tâche tous les TASK_INTERVAL millisecondes et l'alloue.
+         - Génère les nouvelles tâches et les alloue, tous les TASK_INTERVAL millisecondes ou dès
+           l'arrivée d'une tâche selon le processus d'arrivée (voir allocation_due).
          - Resout le problème d'allocation de tâches en utilisant l'algorithme spécifié.
-         - Met à jour la position de chaque taxi.
+         - Met à jour la position de tous les taxis, puis la file et l'itinéraire des seuls taxis qui
+           viennent de terminer une tâche. A partir de config.VECTORIZED_STEP_MIN_TAXIS taxis, ils avancent
+           en une opération (Fleet.step) ; en dessous, la boucle sur Taxi.update est plus rapide (le coût
+           fixe des opérations NumPy dépasse celui de quelques taxis).
         """
         if not self.paused:
-            if current_time - self.last_task_time > self.task_interval:
-                if self.random_task:
-                    new_tasks = self.generate_task()
+            if self.allocation_due(current_time):
+                self.spawn_tasks(current_time)
+
+            with self.profiler.span("deplacement", "movement"):
+                if len(self.taxis) >= config.VECTORIZED_STEP_MIN_TAXIS:
+                    picked_up, completed = self.fleet.step(dt)
+                    for k in picked_up:
+                        self.taxis[k].pick_up(current_time)
+                    finished = [self.taxis[k].complete_task(current_time) for k in completed]
                 else:
-                    new_tasks = self.created_tasks(config.NUM_TASKS_SPAWN)
-                match self.resolutionType:
-                    case "greedy":
-                        self.greedy_task_assignment(self.taxis, new_tasks)
-                    case "dcop":
-                        if len(new_tasks)!= 0:
-                            self.generate_dcop(self.taxis, new_tasks, "dcop.yaml")
-                            allocation=self.solve_dcop("dcop.yaml")
-                            self.attribution_dcop(new_tasks, self.taxis, allocation['assignment'])
-                    case "PSI":
-                        self.PSI_task_assignment(self.taxis, new_tasks)
-                    case "SSI":
-                        self.SSI_task_assignment(self.taxis, new_tasks)
-                    case "regret":
-                        self.regret_task_assignment(self.taxis, new_tasks)
-                    case _:
-                        print("Résolution non reconnue, on utilise greedy")
-                        self.greedy_task_assignment(self.taxis, new_tasks)
-                    
-                #Pour python 3.8 pour DCOP
-                # if self.resolutionType== "greedy":
-                #     self.greedy_task_assignment(self.taxis, new_tasks)
-                # elif self.resolutionType=="dcop":
-                #     if len(new_tasks)!=0:
-                #         self.generate_dcop(self.taxis, new_tasks, "dcop.yaml")
-                    
-                #         allocation=self.solve_dcop("dcop.yaml")
-                #         self.attribution_dcop(new_tasks, self.taxis, allocation['assignment'])
-                
-                mean_cost = sum([taxi.current_route_cost for taxi in self.taxis]) / len(self.taxis)
-                self.mean_route_cost.append(mean_cost)
-                
-                self.last_task_time = current_time
-
-            for taxi in self.taxis:
-                taxi.update(dt)
-
-    def draw(self, screen):
-        """Affiche l'environnement, les trajets planifiés et les taxis."""
-        screen.fill(config.WHITE)
-
-        # Pour chaque taxi, dessiner son itinéraire et sa position
-        for taxi in self.taxis:
-            if taxi.route and taxi.target_index < len(taxi.route):
-                points = [taxi.position] + taxi.route[taxi.target_index:]
-
-                for i in range(len(points) - 1):
-                    # Vérifier si ce segment correspond à une tâche en cours
-                    if taxi.isWorking and i == taxi.target_index - 1 and i % 2 == 0:
-                        line_color = config.ORANGE  # Segment de la tâche active
-                    else:
-                        line_color = config.BLACK  # Autres segments
+                    finished = [taxi.update(dt, current_time) for taxi in self.taxis]
+                for done in finished:
+                    if done is not None:
+                        self.record_completion(done)
 
-                    pygame.draw.line(screen, line_color, points[i], points[i + 1], 2)
+    def allocate(self, tasks, deadline=None):
+        """
+        Alloue les tâches aux taxis avec l'algorithme choisi.
+        Tous les algorithmes sont "anytime" : passé deadline (échéance au sens de time.perf_counter,
+        par défaut dans config.ALLOCATION_BUDGET secondes), ils s'arrêtent et appliquent la meilleure
+        allocation trouvée, ce qui borne la durée d'un tour quelle que soit la taille du lot.
+        """
+        if deadline is None:
+            deadline = deadline_in(config.ALLOCATION_BUDGET)
+        match self.resolutionType:
+            case "greedy":
+                self.greedy_task_assignment(self.taxis, tasks, deadline)
+            case "dcop":
+                if len(tasks)!= 0:
+                    if self.algo.startswith("pydcop-"):
+                        # Ancien fonctionnement : fichier yaml et appel de pydcop dans un sous-processus
+                        self.generate_dcop(self.taxis, tasks, "dcop.yaml")
+                        allocation=self.solve_dcop("dcop.yaml", deadline)
+                    else:
+                        model = self.build_dcop_model(self.taxis, tasks)
+                        allocation = dcop.solve(model, self.algo, self.np_rng, deadline)
+                    if allocation is None:
+                        print("Pas de solution DCOP, on utilise greedy")
+                        self.greedy_task_assignment(self.taxis, tasks, deadline)
+                    else:
+                        self.attribution_dcop(tasks, self.taxis, allocation['assignment'])
+            case "PSI":
+                self.PSI_task_assignment(self.taxis, tasks, deadline)
+            case "SSI":
+                self.SSI_task_assignment(self.taxis, tasks, deadline)
+            case "regret":
+                self.regret_task_assignment(self.taxis, tasks, deadline)
+            case "optimal":
+                self.optimal_task_assignment(self.taxis, tasks, deadline)
+            case "agents":
+                self.agent_task_assignment(self.taxis, tasks, deadline)
+            case _:
+                print("Résolution non reconnue, on utilise greedy")
+                self.greedy_task_assignment(self.taxis, tasks, deadline)
+            
+        #Pour python 3.8 pour DCOP
+        # if self.resolutionType== "greedy":
+        #     self.greedy_task_assignment(self.taxis, tasks)
+        # elif self.resolutionType=="dcop":
+        #     if len(tasks)!=0:
+        #         self.generate_dcop(self.taxis, tasks, "dcop.yaml")
+            
+        #         allocation=self.solve_dcop("dcop.yaml")
+        #         self.attribution_dcop(tasks, self.taxis, allocation['assignment'])
 
-                # Affichage des waypoints : Départ (vert), Destination (bleu)
-                for i, point in enumerate(taxi.route[taxi.target_index:], start=taxi.target_index):
-                    color = config.GREEN if i % 2 == 0 else config.BLUE
-                    pygame.draw.circle(screen, color, (int(point[0]), int(point[1])), 5)
-                    if i % 2 == 0:
-                        task_index = i // 2
-                        if task_index < len(taxi.tasks):
-                            task = taxi.tasks[task_index]
-                            font = pygame.font.SysFont(None, 20)
-                            text = font.render(f"Task {task.id}", True, config.BLACK)                            
-                            screen.blit(text, (task.start[0] - 10, task.start[1] - 20))
+    def reoptimize_unstarted(self, current_time):
+        """
+        Réoptimisation à horizon glissant : les tâches pas encore prises en charge sont retirées
+        des files des taxis les plus chargés puis réallouées avec l'algorithme choisi.
+        La réallocation n'est gardée que si elle diminue le coût total restant de la flotte.
+        Les tâches plus anciennes que config.REOPTIMIZATION_LATENCY_CAP ne sont pas déplacées, pour ne pas
+        retarder encore les demandes qui attendent déjà le plus.
+        Le nombre de tâches réallouées découle de config.REOPTIMIZATION_EVALUATIONS (offres par passe), pour que
+        les résultats soient reproductibles. Si config.REOPTIMIZATION_BUDGET est donné, il est en plus ajusté
+        d'une passe à l'autre pour que le temps de calcul mesuré reste proche de ce budget, qui borne aussi la
+        réallocation : les résultats dépendent alors de la vitesse de la machine.
+        """
+        pass_start = time.perf_counter()
+        self.last_reoptimization = current_time
+
+        withdrawn = {} # Dictionnaire de la forme {indice du taxi: [tâches retirées]}
+        count = 0
+        for k in np.argsort(-self.fleet.route_costs(), kind="stable"):
+            if count >= self.reoptimization_batch:
+                break
+            candidates = [task for task in self.taxis[k].tasks if task.picked_up is None and
+                          (task.created is None or current_time - task.created <= config.REOPTIMIZATION_LATENCY_CAP)]
+            # Les tâches en fin de file sont celles qui attendraient le plus longtemps
+            candidates = candidates[-(self.reoptimization_batch - count):]
+            if candidates:
+                withdrawn[int(k)] = candidates
+                count += len(candidates)
+        if not withdrawn:
+            return
+
+        states = [taxi.snapshot() for taxi in self.taxis]
+        cost_before = self.fleet.route_costs().sum()
+        for k, tasks in withdrawn.items():
+            self.taxis[k].withdraw_tasks(tasks)
+        # La réallocation elle-même est bornée par le budget de la passe, s'il y en a un
+        budget = config.REOPTIMIZATION_BUDGET
+        self.allocate([task for tasks in withdrawn.values() for task in tasks],
+                      deadline=None if budget is None else pass_start + budget)
+
+        if self.fleet.route_costs().sum() < cost_before - 1e-9:
+            self.reoptimizations += 1
+        else:
+            # Pas d'amélioration : on revient aux files précédentes
+            for taxi, state in zip(self.taxis, states):
+                taxi.restore(state)
+
+        elapsed = time.perf_counter() - pass_start
+        self.reoptimization_times.append(elapsed)
+        if budget is None:
+            return
+        if elapsed > budget:
+            self.reoptimization_batch = max(1, self.reoptimization_batch // 2)
+        elif elapsed < budget / 2:
+            self.reoptimization_batch = min(config.REOPTIMIZATION_MAX_TASKS, self.reoptimization_batch * 2)
+
+    def next_allocation_time(self):
+        """
+        Temps (en ms) du prochain tour d'allocation : TASK_INTERVAL ms après le précédent pour un processus
+        d'arrivée périodique (batch), sinon l'arrivée de la prochaine tâche (None s'il n'y en a plus),
+        pour que les tâches soient allouées sans attendre un intervalle fixe.
+        """
+        if self.arrivals.periodic:
+            return self.last_task_time + self.task_interval
+        return self.arrivals.next_arrival()
+
+    def allocation_due(self, current_time):
+        """Vrai si un tour d'allocation doit avoir lieu à current_time (en ms)."""
+        if self.arrivals.periodic:
+            return current_time - self.last_task_time > self.task_interval
+        next_time = self.arrivals.next_arrival()
+        return next_time is not None and next_time <= current_time
+
+    def spawn_tasks(self, current_time):
+        """Génère les nouvelles tâches, les alloue avec l'algorithme choisi et enregistre le coût moyen."""
+        new_tasks = self.generate_task(current_time)
+        allocation_start = time.perf_counter()
+        strategy = self.resolutionType if self.algo == "none" else f"{self.resolutionType}/{self.algo}"
+        with self.profiler.allocation_round(strategy, current_time, len(new_tasks)):
+            self.allocate(new_tasks)
+        self.allocation_times.append(time.perf_counter() - allocation_start)
+        for task in new_tasks:
+            task.assigned = current_time
+
+        if self.reoptimize and current_time - self.last_reoptimization >= config.REOPTIMIZATION_INTERVAL:
+            with self.profiler.span("reoptimisation", "allocation"):
+                self.reoptimize_unstarted(current_time)
+
+        # Coût restant moyen des files (Taxi.current_route_cost, exact à tout instant), sans les parcourir.
+        # Dans la version d'origine, c'était la moyenne de la dernière valeur enregistrée sur chaque taxi,
+        # rafraîchie notamment à chaque offre calculée par insertion_heuristic et souvent périmée :
+        # pour les enchères, cette métrique n'est pas comparable aux résultats d'origine (res.json).
+        mean_cost = float(self.fleet.route_costs().mean())
+        self.mean_route_cost.append(mean_cost)
+        
+        self.last_task_time = current_time
 
-            # Dessiner le taxi (cercle rouge) et son identifiant
-            pygame.draw.circle(screen, config.RED, (int(taxi.position[0]), int(taxi.position[1])), 8)
+    def snapshot(self):
+        """Instantané de l'état affiché (fleet.FleetSnapshot), dessinable pendant que la simulation avance."""
+        return FleetSnapshot(self.fleet.copy(), [taxi.id for taxi in self.taxis],
+                             [[(task.id, task.start) for task in taxi.tasks] for taxi in self.taxis])
 
-            font = pygame.font.SysFont(None, 24)
-            text = font.render(str(taxi.id), True, (0, 0, 0))
-            screen.blit(text, (taxi.position[0] - 10, taxi.position[1] - 20))
+    def draw(self, screen, snapshot=None):
+        """
+        Affiche l'environnement, les trajets planifiés et les taxis (voir renderer.Renderer),
+        d'après snapshot ou l'état courant. Retourne les rectangles de l'écran modifiés,
+        à passer à pygame.display.update.
+        """
+        if self.renderer is None:
+            from renderer import Renderer # Importé ici pour que la simulation puisse tourner sans pygame (voir headless.py)
+            self.renderer = Renderer(screen.get_size())
+        return self.renderer.draw(screen, self.snapshot() if snapshot is None else snapshot)
 
     def toggle_pause(self):
+        import pygame
         if self.paused:
             # Reprendre : Ajuster last_task_time pour ne pas sauter des tâches
             self.last_task_time += pygame.time.get_ticks() - self.pause_start_time
@@ -539,7 +738,18 @@ class Simulation:
 
         self.paused = not self.paused
 
-def main(resolutionType, isPenalty=False, random_task=True, algo="none"):
+def main(resolutionType, isPenalty=False, random_task=True, algo="none", threaded=None, realtime=None):
+    """
+    Simulation avec affichage pygame. Si threaded (config.RENDER_THREADED par défaut), la simulation avance
+    dans son propre thread (runner.SimulationRunner), en temps réel ou aussi vite que possible selon realtime
+    (config.REALTIME par défaut), et l'affichage dessine au plus FPS fois par seconde le dernier instantané publié.
+    Sinon, mise à jour et affichage se font à tour de rôle, FPS fois par seconde.
+    """
+    import pygame
+    if threaded is None:
+        threaded = config.RENDER_THREADED
+    if realtime is None:
+        realtime = config.REALTIME
     clock_start = pygame.time.get_ticks()
     step = 0
     pygame.init()
@@ -549,37 +759,70 @@ def main(resolutionType, isPenalty=False, random_task=True, algo="none"):
 
     sim = Simulation(config.WIDTH, config.HEIGHT, config.NUM_TAXIS, config.TASK_INTERVAL, config.NUM_TASKS_SPAWN, resolutionType, isPenalty, random_task, algo)
     print(sim)
-    running = True
-    tasks_left = True
-    taxi_empty = 0
-    while running and (sim.task_list != [] or tasks_left):
-        tasks_left = True
-        dt = clock.tick(config.FPS) / 1000.0  # dt en secondes (60 FPS)
-        current_time = pygame.time.get_ticks()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    sim.toggle_pause()
-                elif event.key == pygame.K_ESCAPE:
+    if threaded:
+        from runner import SimulationRunner
+        runner = SimulationRunner(sim, realtime)
+        runner.start()
+        drawn = None # Dernier instantané dessiné
+        frames = 0
+        running = True
+        while running and runner.is_alive():
+            clock.tick(config.FPS)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        runner.toggle_pause()
+                    elif event.key == pygame.K_ESCAPE:
+                        running = False
+            snapshot = runner.snapshot
+            if snapshot is not drawn: # Rien de nouveau à afficher sinon
+                with sim.profiler.span("affichage", "drawing"):
+                    pygame.display.update(sim.draw(screen, snapshot))
+                drawn = snapshot
+                frames += 1
+        runner.stop()
+        runner.join()
+        step = runner.steps
+        sim_time = runner.current_time / 1000 # Horloge simulée du runner, indépendante du temps réel
+        print(f"{frames} images affichées, {runner.published - frames} instantanés sautés")
+    else:
+        running = True
+        tasks_left = True
+        taxi_empty = 0
+        while running and (sim.arrivals or tasks_left):
+            tasks_left = True
+            dt = clock.tick(config.FPS) / 1000.0  # dt en secondes (60 FPS)
+            current_time = pygame.time.get_ticks()
 
-        sim.update(current_time, dt)
-        sim.draw(screen)
-        step+=1
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        sim.toggle_pause()
+                    elif event.key == pygame.K_ESCAPE:
+                        running = False
+
+            sim.update(current_time, dt)
+            with sim.profiler.span("affichage", "drawing"):
+                dirty = sim.draw(screen)
+            step+=1
         
-        taxi_empty = 0
-        for taxi in sim.taxis:
-            if taxi.tasks == []:
-                taxi_empty += 1
-        if taxi_empty == len(sim.taxis):
-            tasks_left = False
-        pygame.display.flip()
+            taxi_empty = 0
+            for taxi in sim.taxis:
+                if taxi.tasks == []:
+                    taxi_empty += 1
+            if taxi_empty == len(sim.taxis):
+                tasks_left = False
+            with sim.profiler.span("affichage", "drawing"):
+                pygame.display.update(dirty) # Seules les zones modifiées sont envoyées à l'écran
 
     clock_end = pygame.time.get_ticks()
-    time_elapsed = (clock_end - clock_start) / 1000  # Temps écoulé en secondes
+    if not threaded:
+        sim_time = (clock_end - clock_start) / 1000 # Horloge pygame : temps simulé et temps réel coïncident
+    time_elapsed = sim_time # Temps simulé écoulé en secondes
     mean_cost = sum(sim.mean_route_cost) / len(sim.mean_route_cost)
 
     if resolutionType != "dcop":
@@ -615,11 +858,13 @@ def main(resolutionType, isPenalty=False, random_task=True, algo="none"):
         
         print(f"Step {step}, temps : {time_elapsed}s pour resolutionType = {algo}")
 
+    sim.close()
     pygame.quit()
     # sys.exit()
 
 def plot_results(type_eval):
     """Affichage sous forme d'histogramme des temps d'exécution par type d'algorithme"""
+    from matplotlib import pyplot as plt
     try:
         with open("res.json", "r") as f:
             data = json.load(f)
@@ -660,6 +905,7 @@ def plot_results(type_eval):
 
 def plot_dcop_results(type_eval):
     """Affichage sous forme d'histogramme des temps d'exécution par type d'algorithme pour dcop"""
+    from matplotlib import pyplot as plt
     try:
         with open("res_dcop.json", "r") as f:
             data = json.load(f)
@@ -0,0 +1,112 @@
+import csv
+import json
+import math
+import os
+import numpy as np
+from task import Task
+
+
+# Format binaire des traces : une suite d'enregistrements de taille fixe (little-endian), sans en-tête.
+# time est le temps de création de la tâche (en ms), NaN s'il n'est pas connu.
+TRACE_DTYPE = np.dtype([("task_id", "<i8"), ("start_x", "<f8"), ("start_y", "<f8"), ("end_x", "<f8"), ("end_y", "<f8"),
+                        ("time", "<f8")])
+TRACE_CHUNK = 65536 # Nombre d'enregistrements convertis en tâches à la fois
+
+
+def random_tasks(rng, width, height):
+    """Génère indéfiniment des tâches avec un départ et une destination aléatoires dans l'environnement."""
+    task_id = 0
+    while True:
+        start = (rng.randint(0, width), rng.randint(0, height))
+        destination = (rng.randint(0, width), rng.randint(0, height))
+        yield Task(start, destination, task_id)
+        task_id += 1
+
+
+def json_tasks(path):
+    """
+    Tâches d'un fichier json (une liste [{"start": [x, y], "end": [x, y], "task_id": id}, ...]),
+    comme task_created.json, avec éventuellement leur temps de création "time" (en ms).
+    Le fichier est lu en entier : préférer jsonl_tasks pour les gros fichiers.
+    """
+    with open(path, "r") as f:
+        task_json = json.load(f)
+    for task in task_json:
+        yield Task(task["start"], task["end"], task["task_id"], task.get("time"))
+
+
+def jsonl_tasks(path):
+    """Tâches d'un fichier json-lines (un objet {"start": ..., "end": ..., "task_id": ..., "time": ...} par ligne), lu ligne par ligne."""
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                task = json.loads(line)
+                yield Task(task["start"], task["end"], task["task_id"], task.get("time"))
+
+
+def csv_tasks(path):
+    """Tâches d'un fichier csv de colonnes task_id, start_x, start_y, end_x, end_y (et time, facultative), lu ligne par ligne."""
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            created = float(row["time"]) if row.get("time") else None
+            yield Task((float(row["start_x"]), float(row["start_y"])),
+                       (float(row["end_x"]), float(row["end_y"])),
+                       int(row["task_id"]), created)
+
+
+def trace_tasks(path):
+    """
+    Tâches d'une trace binaire (voir TRACE_DTYPE et write_trace), projetée en mémoire avec mmap :
+    seules les pages lues sont chargées, par blocs de TRACE_CHUNK tâches.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    records = np.memmap(path, dtype=TRACE_DTYPE, mode="r")
+    for begin in range(0, len(records), TRACE_CHUNK):
+        for task_id, start_x, start_y, end_x, end_y, created in records[begin:begin + TRACE_CHUNK].tolist():
+            yield Task((start_x, start_y), (end_x, end_y), task_id, None if math.isnan(created) else created)
+
+
+def write_trace(path, tasks):
+    """Ecrit des tâches (un itérable quelconque, par exemple une autre source) dans une trace binaire, par blocs."""
+    with open(path, "wb") as f:
+        chunk = []
+        for task in tasks:
+            created = math.nan if task.created is None else task.created
+            chunk.append((task.id, task.start[0], task.start[1], task.destination[0], task.destination[1], created))
+            if len(chunk) == TRACE_CHUNK:
+                np.array(chunk, dtype=TRACE_DTYPE).tofile(f)
+                chunk = []
+        if chunk:
+            np.array(chunk, dtype=TRACE_DTYPE).tofile(f)
+
+
+def file_tasks(path):
+    """Choisit le lecteur selon l'extension du fichier (.json, .jsonl, .csv ou .bin pour une trace binaire)."""
+    readers = {".json": json_tasks, ".jsonl": jsonl_tasks, ".csv": csv_tasks, ".bin": trace_tasks}
+    extension = os.path.splitext(path)[1]
+    if extension not in readers:
+        raise ValueError(f"Format de fichier de tâches non reconnu : {path}")
+    return readers[extension](path)
+
+
+class TaskStream:
+    """
+    Consomme une source de tâches (un itérateur) par lots, sans la charger ni la copier :
+    chaque lot coûte O(taille du lot). Une tâche est lue à l'avance pour savoir s'il en reste
+    (bool(stream) est faux quand la source est épuisée).
+    """
+    def __init__(self, tasks):
+        self.tasks = iter(tasks)
+        self.pending = next(self.tasks, None) # Prochaine tâche, déjà lue
+
+    def __bool__(self):
+        return self.pending is not None
+
+    def batch(self, num_tasks):
+        """Retourne les num_tasks prochaines tâches (moins si la source s'épuise)."""
+        tasks = []
+        while self.pending is not None and len(tasks) < num_tasks:
+            tasks.append(self.pending)
+            self.pending = next(self.tasks, None)
+        return tasks
@@ -0,0 +1,216 @@
+import heapq
+import math
+
+
+class SpatialIndex:
+    """
+    Index spatial en grille des itinéraires des taxis : chaque taxi est enregistré dans les cases
+    contenant sa position et les points de sa file (départs et destinations des tâches).
+
+    Il permet aux allocateurs de ne calculer l'offre que des taxis proches d'une tâche, en parcourant
+    les cases par anneaux croissants autour du départ de la tâche. La recherche s'arrête dès qu'une
+    borne inférieure prouve qu'aucun taxi non encore vu ne peut battre les meilleures offres trouvées :
+    le résultat est identique à un parcours de toute la flotte.
+
+    Une insertion au milieu d'un long segment peut être peu coûteuse même loin de ses extrémités :
+    les taxis dont la route a un segment plus long que max_leg ne sont pas recherchés spatialement,
+    leur offre est toujours calculée.
+    """
+    def __init__(self, cell_size, max_leg, taxis=()):
+        self.cell_size = cell_size
+        self.max_leg_limit = max_leg
+        self.long_taxis = set() # Taxis dont la route a un segment plus long que max_leg_limit
+        self.leg_bound = 0.0    # Majorant des segments des autres taxis (au plus max_leg_limit)
+        self.cells = {}      # Dictionnaire de la forme {(cx, cy): {indice du taxi: nombre de points}}
+        self.route_cells = {} # Cases des points de la file de chaque taxi
+        self.route_keys = {}  # Tâches de la file lors du dernier enregistrement (pour détecter les changements)
+        self.route_legs = {}  # Plus long segment entre deux points de la file de chaque taxi
+        self.position_cells = {} # Case de la position de chaque taxi
+        self.max_leg = {}     # Plus long segment de la route de chaque taxi, depuis sa position
+        self.bounds = None    # Cases extrêmes occupées (cx_min, cy_min, cx_max, cy_max)
+        for k, taxi in enumerate(taxis):
+            self.sync_taxi(k, taxi)
+
+    def cell(self, point):
+        return (int(point[0] // self.cell_size), int(point[1] // self.cell_size))
+
+    def _add(self, k, cell):
+        taxis = self.cells.setdefault(cell, {})
+        taxis[k] = taxis.get(k, 0) + 1
+        if self.bounds is None:
+            self.bounds = (cell[0], cell[1], cell[0], cell[1])
+        else:
+            x0, y0, x1, y1 = self.bounds
+            self.bounds = (min(x0, cell[0]), min(y0, cell[1]), max(x1, cell[0]), max(y1, cell[1]))
+
+    def _remove(self, k, cell):
+        taxis = self.cells[cell]
+        taxis[k] -= 1
+        if taxis[k] == 0:
+            del taxis[k]
+            if not taxis:
+                del self.cells[cell]
+
+    def move_taxi(self, k, position):
+        """Met à jour la case de la position du taxi k (O(1))."""
+        cell = self.cell(position)
+        if self.position_cells.get(k) != cell:
+            if k in self.position_cells:
+                self._remove(k, self.position_cells[k])
+            self._add(k, cell)
+            self.position_cells[k] = cell
+
+    def sync_taxi(self, k, taxi):
+        """
+        Met à jour l'enregistrement complet du taxi k : position et points de sa file de tâches
+        (ceux utilisés par bids.BidEngine). A appeler avant une allocation et quand sa file change.
+        """
+        # Les files peuvent être réordonnées sans changer de longueur ni d'extrémités (plan_route, restore) :
+        # le taxi est réenregistré dès que la suite des tâches de sa file change
+        key = tuple(map(id, taxi.tasks))
+        if self.route_keys.get(k) != key:
+            for cell in self.route_cells.get(k, []):
+                self._remove(k, cell)
+            points = []
+            for task in taxi.tasks:
+                points.append(task.start)
+                points.append(task.destination)
+            self.route_cells[k] = [self.cell(point) for point in points]
+            for cell in self.route_cells[k]:
+                self._add(k, cell)
+            self.route_keys[k] = key
+            self.route_legs[k] = max((math.dist(a, b) for a, b in zip(points, points[1:])), default=0.0)
+
+        # Le premier segment part de la position actuelle du taxi
+        first_leg = math.dist(taxi.position, taxi.tasks[0].start) if taxi.tasks else 0.0
+        self.max_leg[k] = max(self.route_legs[k], first_leg)
+        if self.max_leg[k] > self.max_leg_limit:
+            self.long_taxis.add(k)
+        else:
+            self.long_taxis.discard(k)
+            self.leg_bound = max(self.leg_bound, self.max_leg[k])
+        self.move_taxi(k, taxi.position)
+
+    def sync(self, taxis):
+        self.leg_bound = 0.0
+        for k, taxi in enumerate(taxis):
+            self.sync_taxi(k, taxi)
+
+    def rings(self, point):
+        """
+        Parcourt les cases par anneaux (distance de Tchebychev) croissants autour de point.
+        Retourne, pour chaque anneau r, l'ensemble des taxis qui y ont un point ; les taxis
+        qui n'apparaissent dans aucun des anneaux 0..r sont à une distance d'au moins r * cell_size.
+        """
+        if self.bounds is None:
+            return
+        cx, cy = self.cell(point)
+        x0, y0, x1, y1 = self.bounds
+        max_ring = max(cx - x0, x1 - cx, cy - y0, y1 - cy, 0)
+        for r in range(max_ring + 1):
+            taxis = set()
+            for x in range(cx - r, cx + r + 1):
+                for y in range(cy - r, cy + r + 1):
+                    if max(abs(x - cx), abs(y - cy)) != r:
+                        continue
+                    taxis.update(self.cells.get((x, y), ()))
+            yield r, taxis
+
+    def best_bids(self, engine, task, count=1):
+        """
+        Retourne les count meilleures offres [(offre, indice du taxi, position d'insertion)...] pour la tâche,
+        en ne calculant (avec engine, un bids.BidEngine sur toute la flotte) que l'offre des taxis proches
+        et des taxis à longs segments.
+
+        Borne inférieure pour un taxi dont tous les points sont à une distance >= R du départ s de la tâche
+        et dont les segments mesurent au plus M (leg_bound, nul pour une flotte inoccupée) :
+           - insertion en fin de file (seule possible pour un taxi libre) : d(fin, s) + d(s, e) >= R + longueur de la tâche
+           - insertion entre P et N : d(P, s) + d(s, e) + d(e, N) - d(P, N) >= R + longueur - M,
+             et aussi >= d(P, s) + d(s, N) - d(P, N) >= 2R - M
+        Toute offre est donc au moins max(R + longueur - M, min(R + longueur, 2R - M)).
+        """
+        length = task.length
+        found = [] # Offres calculées, de la forme [(offre, indice du taxi, position d'insertion)...]
+
+        def evaluate(taxis):
+            bids, index = engine.bids([task], taxi_indices=taxis)
+            found.extend(zip(bids[:, 0].tolist(), taxis, index[:, 0].tolist()))
+
+        seen = set(self.long_taxis)
+        if seen:
+            evaluate(sorted(seen))
+        for r, taxis in self.rings(task.start):
+            new = sorted(taxis - seen)
+            if new:
+                evaluate(new)
+                seen.update(new)
+            # Les taxis pas encore vus sont à une distance d'au moins r * cell_size
+            radius = r * self.cell_size
+            lower_bound = max(0.0, radius + length - self.leg_bound, min(radius + length, 2 * radius - self.leg_bound))
+            # Les offres étant positives, inutile de chercher la count-ième meilleure tant que la borne est nulle
+            if lower_bound > 0 and len(found) >= count and lower_bound > heapq.nsmallest(count, found)[-1][0]:
+                break
+        return heapq.nsmallest(count, found)
+
+
+def check_against_full_scan(num_taxis=40, num_tasks=20, trials=200, seed=0, cell_size=50, max_leg=100):
+    """
+    Compare, sur des flottes et des tâches aléatoires, les deux meilleures offres trouvées par
+    SpatialIndex.best_bids à celles d'un parcours de toute la flotte (BidEngine.bids).
+    Les files de certains taxis sont modifiées après leur enregistrement, sans changer de longueur
+    ni d'extrémités, pour vérifier que l'index suit aussi ces changements. Le coût tenu à jour de chaque
+    file (Taxi.current_route_cost) est aussi comparé à un calcul direct. Retourne le nombre d'écarts.
+    """
+    import itertools
+    import math
+    import random
+    from bids import BidEngine
+    from task import Task
+    from taxi import Taxi
+
+    rng = random.Random(seed)
+    ids = itertools.count()
+
+    def point():
+        return (rng.uniform(0, 800), rng.uniform(0, 600))
+
+    mismatches = 0
+    for _ in range(trials):
+        taxis = [Taxi(k, point()) for k in range(num_taxis)]
+        for taxi in taxis:
+            # Files courtes (segments sous max_leg) ou longues, et taxis libres
+            for _ in range(rng.choice([0, 0, 1, 3, 5])):
+                start = point()
+                if rng.random() < 0.7:
+                    start = taxi.position if not taxi.tasks else taxi.tasks[-1].destination
+                    start = (start[0] + rng.uniform(-40, 40), start[1] + rng.uniform(-40, 40))
+                taxi.append_task(Task(start, (start[0] + rng.uniform(-40, 40), start[1] + rng.uniform(-40, 40)), next(ids)))
+        index = SpatialIndex(cell_size, max_leg, taxis)
+        for taxi in taxis:
+            if len(taxi.tasks) > 2 and rng.random() < 0.5:
+                # Réordonnement (plan_route) ou remplacement des tâches du milieu (restore)
+                middle = taxi.tasks[1:-1]
+                if rng.random() < 0.5:
+                    rng.shuffle(middle)
+                else:
+                    middle = [Task(point(), point(), next(ids)) for _ in middle]
+                taxi.set_tasks([taxi.tasks[0]] + middle + [taxi.tasks[-1]])
+        for taxi in taxis:
+            points = [taxi.position] + [point for task in taxi.tasks for point in (task.start, task.destination)]
+            if abs(taxi.current_route_cost - sum(math.dist(a, b) for a, b in zip(points, points[1:]))) > 1e-6:
+                mismatches += 1
+        index.sync(taxis)
+        engine = BidEngine(taxis, isPenalty=rng.random() < 0.5)
+        for _ in range(num_tasks):
+            start = point()
+            task = Task(start, (start[0] + rng.uniform(-100, 100), start[1] + rng.uniform(-100, 100)), next(ids))
+            bids, _ = engine.bids([task])
+            expected = sorted(bids[:, 0].tolist())[:2]
+            found = [bid for bid, _, _ in index.best_bids(engine, task, count=2)]
+            if any(abs(a - b) > 1e-9 for a, b in zip(expected, found)):
+                mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    print(f"Ecarts avec le parcours de toute la flotte : {check_against_full_scan()}")
@@ -1,9 +1,23 @@
+import itertools
+import math
+
+
 class Task:
     """Représente une tâche (trajet) avec un id, un point de départ et une destination."""
-    def __init__(self, start, destination, id=None):
+    __slots__ = ("id", "key", "start", "destination", "length", "created", "assigned", "picked_up", "dropped_off")
+    _keys = itertools.count() # Clés internes, uniques même si les ids manquent ou se répètent
+
+    def __init__(self, start, destination, id=None, created=None):
         self.id = id
+        self.key = next(Task._keys)    # Clé unique de la tâche (caches de distances)
         self.start = start             # Point de départ (x, y)
         self.destination = destination # Destination (x, y)
+        self.length = math.dist(start, destination) # Longueur du trajet, calculée une seule fois
+        # Temps simulés (en ms) du cycle de vie de la tâche, None tant que l'étape n'a pas eu lieu
+        self.created = created   # Arrivée de la demande
+        self.assigned = None     # Allocation à un taxi
+        self.picked_up = None    # Arrivée du taxi au départ
+        self.dropped_off = None  # Arrivée à destination
 
     def __repr__(self):
         return f"Task(id={self.id}, start={self.start}, destination={self.destination})"
@@ -1,134 +1,347 @@
 import math
-import itertools
-import config
+import planner
+from profiling import NullProfiler
+from fleet import Fleet, RouteView
+from distances import DistanceCache
 
 class Taxi:
-    """Un taxi qui se déplace dans l'environnement pour exécuter des tâches."""
-    def __init__(self, id, position):
+    """
+    Un taxi qui se déplace dans l'environnement pour exécuter des tâches.
+    Sa position, sa route et son état sont stockés dans une ligne des tableaux d'un fleet.Fleet
+    (partagé par toute la flotte), le taxi n'en est qu'une vue.
+    Les distances entre tâches sont lues dans un distances.DistanceCache, lui aussi partagé.
+    Les appels à plan_route sont comptés par profiler (celui de la simulation, voir profiling.py).
+    """
+    __slots__ = ("id", "fleet", "index", "tasks", "route_tasks", "allow_reordering", "distances", "route_planner", "profiler")
+
+    def __init__(self, id, position, fleet=None, distances=None, profiler=None):
+        if fleet is None:
+            fleet = Fleet() # Taxi isolé : une flotte à lui seul
+        if distances is None:
+            distances = DistanceCache()
         self.id = id                 # Identifiant unique du taxi
-        self.position = position     # Position actuelle (x, y)
-        self.tasks = []              # Liste des tâches attribuées (dans l'ordre optimal), self.tasks = [task1, task2, ...]
-        self.route = []              # Liste des points (waypoints) à suivre, calculée par plan_route(), self.route = [start, destination, start, destination, ...]
-        self.target_index = 0        # Indice du waypoint courant dans self.route
-        self.current_route_cost = 0  # Coût total du chemin planifié
-        self.isWorking = False       # ici on recupere pour l'affichage si le taxi est entre le depart et la destination d'une tache ou si il va vers le depart d'une tache
+        self.fleet = fleet           # Tableaux de la flotte contenant l'état du taxi
+        self.index = fleet.add(position) # Ligne du taxi dans ces tableaux
+        self.tasks = []              # Liste des tâches attribuées (dans l'ordre optimal), self.tasks = [task1, task2, ...],
+                                     # à modifier avec insert_task, append_task, pop_task ou set_tasks pour tenir son coût à jour
+        self.route_tasks = []        # Tâches de la route, dans son ordre : les waypoints 2i et 2i + 1 sont ceux de route_tasks[i]
         self.allow_reordering = True # On permet de réordonner les tâches par défaut avec plan_route()
-  
+        self.distances = distances   # Cache des distances entre tâches
+        self.route_planner = planner.RoutePlanner(distances) # Garde le dernier plan pour replanifier de façon incrémentale
+        self.profiler = profiler if profiler is not None else NullProfiler()
+
+    @property
+    def position(self):
+        """Position actuelle (x, y)"""
+        return tuple(self.fleet.positions[self.index].tolist())
+
+    @position.setter
+    def position(self, position):
+        self.fleet.positions[self.index] = position
+
+    @property
+    def route(self):
+        """Liste des points (waypoints) à suivre, calculée par plan_route(), self.route = [start, destination, start, destination, ...]"""
+        return RouteView(self.fleet, self.index)
+
+    @route.setter
+    def route(self, points):
+        self.fleet.set_route(self.index, list(points))
+
+    @property
+    def target_index(self):
+        """Indice du waypoint courant dans self.route"""
+        return int(self.fleet.target_index[self.index])
+
+    @target_index.setter
+    def target_index(self, value):
+        self.fleet.target_index[self.index] = value
+
+    @property
+    def current_route_cost(self):
+        """
+        Coût total du chemin planifié depuis la position actuelle :
+        distance(position, départ de la première tâche) + coût de la file, lu en O(1).
+        """
+        if not self.tasks:
+            return 0.0
+        return math.dist(self.position, self.tasks[0].start) + float(self.fleet.queue_cost[self.index])
+
+    @property
+    def isWorking(self):
+        """ici on recupere pour l'affichage si le taxi est entre le depart et la destination d'une tache ou si il va vers le depart d'une tache"""
+        return bool(self.fleet.working[self.index])
+
+    @isWorking.setter
+    def isWorking(self, value):
+        self.fleet.working[self.index] = value
+
+    @property
+    def completed_tasks(self):
+        """Nombre de tâches terminées par le taxi"""
+        return int(self.fleet.completed[self.index])
+
+    @completed_tasks.setter
+    def completed_tasks(self, value):
+        self.fleet.completed[self.index] = value
 
     def calculate_total_route_cost(self): 
-        """On calcule le coût total du chemin planifié, 
-        je l'ai utilisé pour la fonction greedy_task_assignment, 
-        pour avoir accès au coût total de chaque taxi sans faire plan_route"""
-        self.current_route_cost = 0
-        pos = self.position
-        for task in self.tasks:
-            self.current_route_cost += math.dist(pos, task.start) + math.dist(task.start, task.destination)
-            pos = task.destination
+        """On recalcule entièrement le coût de la file (normalement tenu à jour par les méthodes ci-dessous)"""
+        self.set_tasks(self.tasks)
+
+    def _sync_queue(self):
+        fleet, k = self.fleet, self.index
+        fleet.queue_len[k] = len(self.tasks)
+        if self.tasks:
+            fleet.first_start[k] = self.tasks[0].start
+        else:
+            fleet.queue_cost[k] = 0.0
 
+    def set_tasks(self, tasks):
+        """Remplace la file de tâches (par exemple réordonnée) et recalcule son coût en O(n)."""
+        self.tasks = list(tasks)
+        self.fleet.queue_cost[self.index] = self.distances.queue_cost(self.tasks)
+        self._sync_queue()
+
+    def insert_task(self, index, task):
+        """
+        Insère une tâche à la position index de la file, sans replanifier.
+        Le coût de la file est mis à jour en O(1) : seuls les trajets à vide autour de la tâche changent.
+        """
+        tasks = self.tasks
+        index = min(index, len(tasks))
+        prev = tasks[index - 1] if index > 0 else None
+        following = tasks[index] if index < len(tasks) else None
+        delta = task.length
+        if prev is not None:
+            delta += self.distances.hop(prev, task)
+        if following is not None:
+            delta += self.distances.hop(task, following)
+            if prev is not None:
+                delta -= self.distances.hop(prev, following)
+        tasks.insert(index, task)
+        self.fleet.queue_cost[self.index] += delta
+        self._sync_queue()
+
+    def append_task(self, task):
+        """Ajoute une tâche en fin de file, sans replanifier (O(1))."""
+        self.insert_task(len(self.tasks), task)
+
+    def pop_task(self, index=0):
+        """Retire et retourne la tâche index de la file (la première par défaut), le coût de la file est mis à jour en O(1)."""
+        tasks = self.tasks
+        prev = tasks[index - 1] if index > 0 else None
+        following = tasks[index + 1] if index + 1 < len(tasks) else None
+        done = tasks.pop(index)
+        removed = done.length
+        if prev is not None:
+            removed += self.distances.hop(prev, done)
+        if following is not None:
+            removed += self.distances.hop(done, following)
+            if prev is not None:
+                removed -= self.distances.hop(prev, following)
+        self.fleet.queue_cost[self.index] -= removed
+        self._sync_queue()
+        return done
+
+
+    def withdraw_tasks(self, tasks):
+        """
+        Retire de la file des tâches pas encore prises en charge, pour les réallouer.
+        La route n'est reconstruite que si le taxi ne transporte personne (comme dans Simulation.award).
+        """
+        for task in tasks:
+            self.pop_task(self.tasks.index(task))
+        self.route_planner.reset()
+        if not self.isWorking:
+            self.build_route_from_current_tasks()
+
+    def snapshot(self):
+        """Etat de la file, de la route et du planificateur, pour annuler une réallocation avec restore()."""
+        planner = self.route_planner
+        return (list(self.tasks), self.route[:], list(self.route_tasks), self.target_index, self.allow_reordering,
+                list(planner.order), planner.cost, planner.origin, planner.exact)
+
+    def restore(self, state):
+        tasks, route, route_tasks, target_index, allow_reordering, order, cost, origin, exact = state
+        self.set_tasks(tasks)
+        self.route = route
+        self.route_tasks = route_tasks
+        self.target_index = target_index
+        self.allow_reordering = allow_reordering
+        planner = self.route_planner
+        planner.order, planner.cost, planner.origin, planner.exact = order, cost, origin, exact
 
     def plan_route(self):
         """
-        Recalcule l'ordonnancement optimal des tâches en testant toutes les permutations.
+        Recalcule l'ordonnancement optimal des tâches.
         Le coût d'un ordre est défini par : 
            distance(position initiale, tâche.start) + distance(tâche.start, tâche.destination)
            + distances entre la destination d'une tâche et le début de la suivante.
+        Jusqu'à config.MAX_EXACT_PLANNING_TASKS tâches, l'ordre est exact (Held-Karp),
+        au-delà on utilise une heuristique (insertion la plus proche puis 2-opt / or-opt).
+        Le planificateur réutilise le plan précédent quand seules des tâches ont été ajoutées
+        ou terminées depuis (voir planner.RoutePlanner).
         """
+        if self.profiler.active:
+            self.profiler.count("plan_route")
         if not self.tasks:
             self.route = []
-            self.current_route_cost = 0
+            self.route_tasks = []
             self.target_index = 0
             return
 
-        best_order = None
-        best_cost = float('inf')
-        # Tester toutes les permutations possibles des tâches
-        for perm in itertools.permutations(self.tasks):
-            cost = 0
-            pos = self.position
-            for task in perm:
-                cost += math.dist(pos, task.start)
-                cost += math.dist(task.start, task.destination)
-                pos = task.destination
-            if cost < best_cost:
-                best_cost = cost
-                best_order = perm
+        best_order, _ = self.route_planner.plan(self.position, self.tasks)
 
         # Mettre à jour la liste des tâches selon l'ordre optimal trouvé
-        self.tasks = list(best_order)
-        self.current_route_cost = best_cost
+        self.set_tasks(best_order)
 
         # Construire la liste des waypoints : pour chaque tâche, on passe par le départ puis la destination
-        self.route = []
+        route = []
         for task in self.tasks:
-            self.route.append(task.start)
-            self.route.append(task.destination)
+            route.append(task.start)
+            route.append(task.destination)
+        self.route = route
+        self.route_tasks = list(self.tasks)
         self.target_index = 0
 
     def build_route_from_current_tasks(self):
         """Construit la route selon l'ordre actuel des tâches (sans permutations)."""
 
-        self.route = []
-        current_pos = self.position
-        self.current_route_cost = 0
-        
+        route = []
         for task in self.tasks:
-            self.route.append(task.start)
-            self.route.append(task.destination)
-            self.current_route_cost += math.dist(current_pos, task.start) + math.dist(task.start, task.destination)
-            current_pos = task.destination
+            route.append(task.start)
+            route.append(task.destination)
         
+        self.route = route
+        self.route_tasks = list(self.tasks)
         self.target_index = 0
 
+    def extend_route(self, task):
+        """
+        Ajoute les points de la tâche (déjà dans la file) à la suite de l'itinéraire, sans replanifier.
+        Si le taxi n'avait pas d'itinéraire, il est créé.
+        """
+        if not self.route:
+            self.route = [task.start, task.destination]
+            self.route_tasks = [task]
+            self.target_index = 0
+        else:
+            self.route.extend([task.start, task.destination])
+            self.route_tasks.append(task)
 
     def add_task(self, task):
         """Ajoute une tâche à la liste et recalcule le planning."""
-        self.tasks.append(task)
+        self.append_task(task)
         self.plan_route()
 
-    def update(self, dt):
+    def update(self, dt, current_time=None):
         """
         Fait avancer le taxi le long de son itinéraire.
         dt : temps écoulé depuis la dernière mise à jour (en secondes)
+        current_time (en ms) sert à dater la prise en charge ou la dépose de la tâche (voir reach_waypoint).
+        Retourne la tâche terminée, None si aucune ne l'a été.
         """
-        if self.target_index >= len(self.route):
-            return  # Plus rien à faire
+        fleet, k = self.fleet, self.index
+        i = fleet.target_index[k]
+        if i >= fleet.route_len[k]:
+            return None # Plus rien à faire
 
-        target = self.route[self.target_index]
-        dx = target[0] - self.position[0]
-        dy = target[1] - self.position[1]
+        position = fleet.positions[k]
+        x, y = position.tolist()
+        target_x, target_y = fleet.routes[k, i].tolist()
+        dx = target_x - x
+        dy = target_y - y
         distance = math.hypot(dx, dy)
         
         # Si le taxi est très proche du waypoint, on considère qu'il l'a atteint
         if distance < 1:
-            self.position = target
-            self.target_index += 1
-        else:
-            move_distance = config.TAXI_SPEED * dt
-            if move_distance >= distance:
-                self.position = target
-                self.target_index += 1
-            else:
-                ratio = move_distance / distance
-                self.position = (self.position[0] + dx * ratio, self.position[1] + dy * ratio)
-        
-        # On définit ici isWorking pour l'affichage
+            return self.reach_waypoint(current_time)
+        move_distance = fleet.speeds[k] * dt
+        if move_distance >= distance:
+            return self.reach_waypoint(current_time)
+        ratio = move_distance / distance
+        position[0] = x + dx * ratio
+        position[1] = y + dy * ratio
+        fleet.working[k] = (i % 2 == 1)
+        return None
+
+    def update_status(self):
+        """On définit ici isWorking pour l'affichage"""
         if self.target_index < len(self.route):
             self.isWorking = (self.target_index % 2 == 1)
         else:
             self.isWorking = False
 
+    def reach_waypoint(self, current_time=None):
+        """
+        Place le taxi sur son waypoint courant et passe au suivant.
+        Utilisé par update() et par le noyau à événements discrets (events.py) ;
+        Fleet.step fait la même chose pour toute la flotte.
+        current_time (en ms) sert à dater la prise en charge ou la dépose de la tâche.
+        Retourne la tâche terminée, None si aucune ne l'a été.
+        """
+        self.position = self.route[self.target_index]
+        self.target_index += 1
+        self.update_status()
+
         # Si le taxi vient de terminer une tâche (c'est-à-dire atteindre une destination)
         # Comme le chemin est [start, destination, start, destination, ...], dès qu'on a atteint
         # le second point (indice impair) d'une tâche, on considère cette tâche comme terminée.
         if self.target_index >= 1 and self.target_index % 2 == 0:
-            # Retirer la première tâche accomplie et recalculer l'itinéraire avec les tâches restantes
-            if self.tasks:
-                self.tasks.pop(0)
-                if self.allow_reordering:
-                    self.plan_route()
-                else:
-                    self.build_route_from_current_tasks()
-                    
+            return self.complete_task(current_time)
+        self.pick_up(current_time)
+        return None
+
+    def task_at_waypoint(self):
+        """
+        Indice dans la file de la tâche du waypoint que le taxi vient d'atteindre (départ ou destination),
+        None si cette tâche n'est plus dans la file. La tâche est retrouvée par identité dans route_tasks :
+        la route n'étant pas reconstruite quand une tâche est insérée pendant une course (award),
+        ce n'est pas toujours la tâche de rang target_index // 2 de la file, et deux tâches peuvent
+        avoir les mêmes points.
+        """
+        if self.target_index == 0:
+            return None
+        task = self.route_tasks[(self.target_index - 1) // 2]
+        for i, queued in enumerate(self.tasks):
+            if queued is task:
+                return i
+        return None
+
+    def pick_up(self, current_time):
+        """Date la prise en charge de la tâche dont le taxi vient d'atteindre le départ."""
+        i = self.task_at_waypoint()
+        if current_time is not None and i is not None and self.tasks[i].picked_up is None:
+            self.tasks[i].picked_up = current_time
+
+    def complete_task(self, current_time=None):
+        """
+        Retire la tâche accomplie, celle dont le taxi vient d'atteindre la destination (la première
+        par défaut), la date de current_time et recalcule l'itinéraire avec les tâches restantes.
+        Retourne la tâche terminée.
+        """
+        if self.tasks:
+            done = self.pop_task(self.task_at_waypoint() or 0)
+            done.dropped_off = current_time
+            self.completed_tasks += 1
+            self.route_planner.complete_first(done)
+            self.distances.retire(done)
+            if self.allow_reordering:
+                self.plan_route()
+            else:
+                self.build_route_from_current_tasks()
+            return done
+        return None
+
+    def next_arrival_delay(self):
+        """Temps (en secondes) avant d'atteindre le waypoint courant, None si le taxi n'a plus rien à faire."""
+        if self.target_index >= len(self.route):
+            return None
+        distance = math.dist(self.position, self.route[self.target_index])
+        if distance < 1:
+            return 0.0
+        return distance / float(self.fleet.speeds[self.index])
 
     
     def __repr__(self):